@@ -0,0 +1,150 @@
+"""
+Benchmark of parsing and applying players' lines of actions.
+
+Compares Game.process_actions, which parses each line once (with a cache)
+into actions that are dispatched through a table, with the old if-chain that
+split and parsed every action as it went.  Lines are taken at random from a
+pool, as bots tend to send similar lines turn after turn.
+
+Both are timed twice:  once with the game's action methods replaced by ones
+that do nothing, which isolates the cost of parsing and dispatching, and once
+with the real rules.
+
+Usage:  python -m benchmarks.actions [army size per team] [lines]
+"""
+import random
+import sys
+import time
+
+from warcode.common import Type
+from .headless import HeadlessGame, add_army
+
+
+def legacy_process_actions(game, actions, player):
+    """
+    The old way of processing a line of actions, kept for comparison.
+    """
+    for action in actions.split(";"):
+        if player.robot.health <= 0:
+            break
+        tokens = action.strip().split()
+        if len(tokens) == 0:
+            continue
+        try:
+            if tokens[0] == "ATTACK":
+                x, y = int(tokens[1]), int(tokens[2])
+                game.attack(player, x, y)
+                continue
+            if tokens[0] == "BUILD":
+                x, y = int(tokens[1]), int(tokens[2])
+                type = Type.from_string(tokens[3])
+                game.build(player, x, y, type)
+                continue
+            if tokens[0] == "CUT":
+                game.cut(player, int(tokens[1]))
+                continue
+            if tokens[0] == "EXPLODE":
+                game.kill(player)
+                continue
+            if tokens[0] == "MINE":
+                game.mine(player, int(tokens[1]))
+                continue
+            if tokens[0] == "MOVE":
+                x, y = int(tokens[1]), int(tokens[2])
+                game.move(player, x, y)
+                continue
+            if tokens[0] == "TRAIN":
+                game.train(player, Type.from_string(tokens[1]))
+                continue
+            if tokens[0] == "WAIT":
+                continue
+            if tokens[0] == "RESYNC":
+                player.resync()
+                continue
+        except (IndexError, KeyError, ValueError):
+            pass
+
+
+class NoRulesGame(HeadlessGame):
+    """
+    A HeadlessGame whose actions do nothing.
+    """
+    def attack(self, player, x, y):
+        pass
+
+    def build(self, player, x, y, type):
+        pass
+
+    def cut(self, player, tree_id):
+        pass
+
+    def mine(self, player, gold_mine_id):
+        pass
+
+    def move(self, player, x, y):
+        pass
+
+    def train(self, player, type):
+        pass
+
+
+def random_lines(count, seed=1):
+    """
+    Returns count lines of five actions near the middle of a map, a few of
+    them invalid.
+    """
+    rng = random.Random(seed)
+    kinds = ["MOVE {} {}", "ATTACK {} {}", "CUT {}", "MINE {}", "WAIT", "BUILD {} {} HOUSE",
+             "MOVE x {}"]
+    lines = []
+    for _ in range(count):
+        actions = []
+        for _ in range(5):
+            kind = rng.choice(kinds)
+            actions.append(kind.format(*(rng.randint(0, 20) for _ in range(kind.count("{}")))))
+        lines.append(";".join(actions))
+    return lines
+
+
+def measure(game_class, army_size, lines, process, repeats=5):
+    """
+    Returns the mean time in microseconds to process one action, in the
+    fastest of several runs.
+    """
+    return min(run(game_class, army_size, lines, process) for _ in range(repeats))
+
+
+def run(game_class, army_size, lines, process):
+    game = game_class("Melee")
+    players = add_army(game, army_size, Type.ARCHER)
+    rng = random.Random(2)
+    orders = [(rng.choice(players), rng.choice(lines)) for _ in range(len(lines) * 10)]
+
+    actions = 0
+    start_time = time.perf_counter()
+    for player, line in orders:
+        if player.robot.health > 0:
+            process(game, line, player)
+            actions += 5
+    elapsed = time.perf_counter() - start_time
+    return elapsed / actions * 1e6
+
+
+def process_actions(game, actions, player):
+    game.process_actions(actions, player)
+    # Keep the game from recording every line, as it would at the end of each
+    # turn.
+    game.turn_actions = []
+
+
+def main(army_size=100, lines=2000):
+    pool = random_lines(lines)
+    print("{:<10} {:>14} {:>14}".format("rules", "old (us)", "new (us)"))
+    for name, game_class in (("none", NoRulesGame), ("real", HeadlessGame)):
+        old = measure(game_class, army_size, pool, legacy_process_actions)
+        table = measure(game_class, army_size, pool, process_actions)
+        print("{:<10} {:>14.2f} {:>14.2f}".format(name, old, table))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,69 @@
+"""
+Benchmark of resolving ATTACK actions on crowded maps.
+
+Compares Game.attack, which only looks at the squares inside the damage
+radius, with the old scan over every robot and every tree.
+
+Usage:  python -m benchmarks.attack [army size per team] [attacks]
+"""
+import random
+import sys
+import time
+
+from warcode.common import Type
+from .headless import HeadlessGame, add_army
+
+
+def scan_attack(game, player, x, y):
+    """
+    The old way of resolving an attack, kept for comparison.
+    """
+    damage_radius = player.robot.type.damage_radius
+    attack_damage = player.robot.type.attack_damage
+    for player2 in list(game.players.values()):
+        if player2.robot.health <= 0:
+            continue
+        if (player2.robot.x - x) ** 2 + (player2.robot.y - y) ** 2 <= damage_radius:
+            player2.robot.health -= attack_damage
+            if player2.robot.health <= 0:
+                game.kill(player2)
+
+    for tree in list(game.trees.values()):
+        if (tree.x - x) ** 2 + (tree.y - y) ** 2 <= damage_radius:
+            tree.health -= attack_damage
+            if tree.health <= 0:
+                game.kill_tree(tree)
+
+
+def measure(map_name, army_size, attacks, attack):
+    """
+    Returns the mean time in microseconds of one attack by a random archer at a
+    random square within its range.
+    """
+    game = HeadlessGame(map_name)
+    archers = add_army(game, army_size, Type.ARCHER)
+    rng = random.Random(1)
+    reach = int(Type.ARCHER.attack_radius ** 0.5)
+    orders = []
+    for _ in range(attacks):
+        player = rng.choice(archers)
+        orders.append((player, player.robot.x + rng.randint(-reach, reach),
+                       player.robot.y + rng.randint(-reach, reach)))
+
+    start_time = time.perf_counter()
+    for player, x, y in orders:
+        if player.robot.health > 0 and game.map.is_on_the_map(x, y):
+            attack(game, player, x, y)
+    return (time.perf_counter() - start_time) / attacks * 1e6
+
+
+def main(army_size=300, attacks=20000):
+    print("{:<8} {:>6} {:>14} {:>14}".format("map", "army", "scan (us)", "index (us)"))
+    for map_name in ("Melee", "Maze"):
+        scan = measure(map_name, army_size, attacks, scan_attack)
+        index = measure(map_name, army_size, attacks, lambda game, *args: game.attack(*args))
+        print("{:<8} {:>6} {:>14.2f} {:>14.2f}".format(map_name, army_size, scan, index))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
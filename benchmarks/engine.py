@@ -0,0 +1,153 @@
+"""
+Benchmark of the engine on every shipped map, with armies of several sizes
+whose actions come from a scripted, seeded generator instead of bots.
+
+For each map and army size it measures turns per second, actions per second,
+the mean time to build one observation, and the peak memory allocated while
+playing.  The results are printed as json, so that runs on two commits can be
+compared.
+
+Usage:  python -m benchmarks.engine [--turns N] [--armies 0 50 200]
+                                    [--array-map] [--output results.json]
+"""
+import argparse
+import json
+import os.path
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from warcode.common import Type
+from warcode.engine.actions import parse_actions
+from warcode.runner.tournament import all_maps
+from .headless import HeadlessGame, add_army
+
+def map_names(paths):
+    """
+    Returns the names of the maps at paths, as they are reported.
+    """
+    return [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+
+def random_script(seed=0):
+    """
+    Returns a script that has every robot move, attack, cut, and mine near
+    itself at random.  Many of the actions are illegal, as a bot's would be.
+    """
+    rng = random.Random(seed)
+
+    def script(observation):
+        me = next(robot for robot in observation["robots"] if robot["id"] == observation["id"])
+        x, y = me["x"], me["y"]
+        actions = [
+            "MOVE {} {}".format(x + rng.randint(-1, 1), y + rng.randint(-1, 1)),
+            "ATTACK {} {}".format(x + rng.randint(-3, 3), y + rng.randint(-3, 3)),
+        ]
+        if observation["trees"]:
+            actions.append("CUT {}".format(rng.choice(observation["trees"])["id"]))
+        if observation["gold_mines"]:
+            actions.append("MINE {}".format(rng.choice(observation["gold_mines"])["id"]))
+        return ";".join(actions)
+
+    return script
+
+
+class CountingGame(HeadlessGame):
+    """
+    A HeadlessGame that counts the actions it processes.
+    """
+    def __init__(self, *args, **kwargs):
+        self.actions_processed = 0
+        super().__init__(*args, **kwargs)
+
+    def process_actions(self, actions, player):
+        self.actions_processed += len(parse_actions(actions)[0])
+        super().process_actions(actions, player)
+
+
+def new_game(map_name, army_size, array_map):
+    game = CountingGame(map_name, random_script(), array_map=array_map, seed=0)
+    add_army(game, army_size, Type.ARCHER)
+    game.going = True
+    return game
+
+
+def play(game, turns):
+    """
+    Play up to turns turns of the game.  Returns the number played.
+    """
+    played = 0
+    while game.going and played < turns:
+        game.turn += 1
+        game.run_turn()
+        played += 1
+    return played
+
+
+def measure(map_name, army_size, turns, array_map=False):
+    """
+    Returns a dictionary of measurements of playing turns turns of the map with
+    army_size extra archers per team.
+    """
+    game = new_game(map_name, army_size, array_map)
+    robots = len(game.players)
+    start_time = time.perf_counter()
+    played = play(game, turns)
+    elapsed = time.perf_counter() - start_time
+
+    # Observations of every robot left, after the game has moved things about.
+    robots_left = [player.robot for player in game.players.values()]
+    start_time = time.perf_counter()
+    for robot in robots_left:
+        game.get_observation(robot)
+    observation_time = (time.perf_counter() - start_time) / max(1, len(robots_left))
+
+    # tracemalloc slows everything down, so memory is measured on its own run.
+    tracemalloc.start()
+    play(new_game(map_name, army_size, array_map), turns)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "map": map_name,
+        "army": army_size,
+        "robots": robots,
+        "turns": played,
+        "turns_per_second": played / elapsed,
+        "actions_per_second": game.actions_processed / elapsed,
+        "observation_us": observation_time * 1e6,
+        "peak_memory_kib": peak / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=100, help="turns to play per game")
+    parser.add_argument("--armies", type=int, nargs="+", default=[0, 50, 200],
+                        help="extra archers per team")
+    parser.add_argument("--maps", nargs="+", default=None, help="maps to play (default: all)")
+    parser.add_argument("--array-map", action="store_true", help="store maps in numpy arrays")
+    parser.add_argument("--output", help="file to write the results to instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "array_map": args.array_map,
+        "results": [
+            measure(map_name, army_size, args.turns, args.array_map)
+            for map_name in (args.maps or map_names(all_maps()))
+            for army_size in args.armies
+        ],
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Helpers for benchmarking the engine without starting any bot processes.
+"""
+import random
+
+from warcode.common import Robot, Team, Type
+from warcode.engine.game import Game
+from warcode.engine.player import HeadlessPlayer
+
+
+class HeadlessGame(Game):
+    """
+    A Game whose robots are all HeadlessPlayers running the same script.
+    """
+    def __init__(self, map_name, script=None, **kwargs):
+        self.script = script
+        super().__init__(map_name, None, None, **kwargs)
+
+    def create_player(self, robot):
+        return HeadlessPlayer(robot, self.script)
+
+
+def add_army(game, size, type=Type.ARCHER, seed=0):
+    """
+    Place size extra robots of the given type for each team on random empty
+    squares of the game's map.  Returns the new players.
+    """
+    rng = random.Random(seed)
+    empty = [
+        (x, y)
+        for y, row in enumerate(game.map.board)
+        for x, square in enumerate(row)
+        if square == " "
+    ]
+    rng.shuffle(empty)
+    players = []
+    for index, (x, y) in enumerate(empty[:2 * size]):
+        team = Team.RED if index % 2 == 0 else Team.BLUE
+        players.append(game.add_robot(Robot(x, y, type, team, ids=game.ids)))
+    return players
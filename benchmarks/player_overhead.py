@@ -0,0 +1,92 @@
+"""
+Microbenchmark of the per-turn overhead of Player.run_turn.
+
+Runs a bot that answers immediately for a number of turns and reports the wall
+clock time and the engine's own CPU time per turn for:
+
+    legacy       -- the old loop: suspend/resume with signals every turn and
+                    a time.sleep(0.0001) poll on the bot's stdout
+    signals      -- the selector based wait, still suspending the bot
+    cooperative  -- the selector based wait, trusting the bot to block on stdin
+
+Usage:  python -m benchmarks.player_overhead [turns]
+"""
+import fcntl
+import json
+import os
+import os.path
+import statistics
+import sys
+import time
+
+from warcode.common import Robot, Team, Type
+from warcode.engine.player import Player
+
+_my_dir = os.path.dirname(os.path.realpath(__file__))
+_bot_dir = os.path.abspath(os.path.join(_my_dir, os.pardir, "bots", "python_starter"))
+
+_OBSERVATION = {"id": 0, "map": [], "trees": [], "gold_mines": [], "robots": []}
+
+
+class LegacyPlayer(Player):
+    """
+    Reproduces the old sleep-poll loop for comparison.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fd = self.process.process.stdout.fileno()
+        fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+    def run_turn(self, observation, time_limit=20, logger=None):
+        self.process.write((json.dumps(observation) + "\n").encode())
+        self.process.unpause()
+
+        start_time = time.time()
+        while time.time() < start_time + time_limit / 1000:
+            line = self.process.process.stdout.readline()
+            if line:
+                self.process.pause()
+                return line.decode()
+            time.sleep(0.0001) # Sleep for 0.1 ms
+
+        self.process.pause()
+        return "EXPLODE"
+
+
+def measure(player, turns):
+    """
+    Returns (wall times, engine cpu times) per turn, in microseconds.
+    """
+    player.run_turn(_OBSERVATION, time_limit=1000) # Let the interpreter start up.
+
+    wall_times = []
+    cpu_times = []
+    for _ in range(turns):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        player.run_turn(_OBSERVATION, time_limit=1000)
+        cpu_times.append((time.process_time() - cpu_start) * 1e6)
+        wall_times.append((time.perf_counter() - wall_start) * 1e6)
+    player.kill_process()
+    return wall_times, cpu_times
+
+
+def main(turns=2000):
+    robot = Robot(0, 0, Type.PEASANT, Team.RED, id=1)
+    configurations = [
+        ("legacy", lambda: LegacyPlayer(_bot_dir, "python", robot)),
+        ("signals", lambda: Player(_bot_dir, "python", robot)),
+        ("cooperative", lambda: Player(_bot_dir, "python", robot, cooperative=True)),
+    ]
+
+    print("{:<12} {:>14} {:>14} {:>16}".format(
+        "mode", "median (us)", "mean (us)", "engine cpu (us)"))
+    for name, create in configurations:
+        wall_times, cpu_times = measure(create(), turns)
+        print("{:<12} {:>14.1f} {:>14.1f} {:>16.1f}".format(
+            name, statistics.median(wall_times), statistics.mean(wall_times),
+            statistics.mean(cpu_times)))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,277 @@
+"""
+Stress test of the whole engine, processes and all, at the limits of the spec.
+
+Generates a large map with armies of hundreds of robots and synthetic bots in
+a temporary directory, then plays full games with Game.run.  The bots are:
+
+    spam     -- answers every turn with a long list of moves and attacks
+    slow     -- thinks for most of its time limit before answering WAIT
+    crasher  -- usually answers WAIT, but sometimes dies or prints garbage
+
+While a game runs, a background thread samples the number of processes, the
+open file descriptors, and the memory used by the engine and its bots.  The
+report, printed as json, has turns per second, the p50/p95/p99 time of a
+whole turn, and the samples.
+
+Usage:  python -m benchmarks.stress [--red spam] [--blue crasher]
+            [--army 100] [--turns 50] [--width 80] [--height 40]
+            [--cooperative] [--multiplex] [--zygote] [--output report.json]
+"""
+import argparse
+import json
+import os
+import os.path
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+from warcode.common import GameConstants, Team, Type
+from warcode.engine.game import Game
+from warcode.engine.stats import Stats
+
+# The synthetic bots.  They only use the standard library and speak the json
+# protocol, and each answers in multiplexed games too.
+_BOT_PRELUDE = """\
+import json
+import random
+import sys
+import time
+
+multiplex = "--multiplex" in sys.argv[1:]
+
+def answer(observation, actions):
+    if multiplex:
+        actions = str(observation["id"]) + " " + actions
+    sys.stdout.write(actions + "\\n")
+    sys.stdout.flush()
+
+for line in sys.stdin:
+    observation = json.loads(line)
+"""
+
+BOTS = {
+    "spam": _BOT_PRELUDE + """\
+    me = [robot for robot in observation["robots"] if robot["id"] == observation["id"]][0]
+    actions = []
+    for _ in range(25):
+        actions.append("MOVE {} {}".format(me["x"] + random.randint(-1, 1),
+                                           me["y"] + random.randint(-1, 1)))
+        actions.append("ATTACK {} {}".format(me["x"] + random.randint(-3, 3),
+                                             me["y"] + random.randint(-3, 3)))
+    answer(observation, ";".join(actions))
+""",
+    "slow": _BOT_PRELUDE + """\
+    time.sleep(0.015)
+    answer(observation, "WAIT")
+""",
+    "crasher": _BOT_PRELUDE + """\
+    roll = random.random()
+    if roll < 0.01:
+        sys.exit(1)
+    if roll < 0.02:
+        raise RuntimeError("crashed on purpose")
+    if roll < 0.03:
+        answer(observation, "NOT AN ACTION")
+    else:
+        answer(observation, "WAIT")
+""",
+}
+
+
+def write_bot(directory, kind):
+    """
+    Write a synthetic bot of the given kind into directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "main.py"), "w") as file:
+        file.write(BOTS[kind])
+    with open(os.path.join(directory, "language"), "w") as file:
+        file.write("python")
+
+
+def write_map(path, width, height, army, seed=0):
+    """
+    Write a random map of the given size to path.  Each team gets a house and
+    army archers and peasants on its own side of the map.  About a tenth of
+    the other squares are walls, trees, or gold mines.
+    """
+    rng = random.Random(seed)
+    ids = iter(rng.sample(range(1, 10 ** 7), width * height))
+    board = [[" "] * width for _ in range(height)]
+    trees, gold_mines, robots = [], [], []
+
+    squares = [(x, y) for y in range(height) for x in range(width)]
+    rng.shuffle(squares)
+    for team, side in ((Team.RED, range(0, width // 3)),
+                       (Team.BLUE, range(width - width // 3, width))):
+        spots = [(x, y) for x, y in squares if x in side and board[y][x] == " "]
+        for index, (x, y) in enumerate(spots[:army + 1]):
+            type = "HOUSE" if index == 0 else ("ARCHER" if index % 2 else "PEASANT")
+            health = Type.from_string(type).starting_health
+            id = next(ids)
+            board[y][x] = id
+            robots.append({"x": x, "y": y, "type": type, "team": team.to_string(),
+                           "health": health, "id": id})
+
+    for x, y in squares:
+        if board[y][x] != " ":
+            continue
+        roll = rng.random()
+        if roll < 0.05:
+            board[y][x] = "W"
+        elif roll < 0.09:
+            id = next(ids)
+            board[y][x] = id
+            trees.append({"x": x, "y": y, "health": GameConstants.TREE_STARTING_HEALTH, "id": id})
+        elif roll < 0.10:
+            id = next(ids)
+            board[y][x] = id
+            gold_mines.append({"x": x, "y": y, "health": GameConstants.GOLD_MINE_STARTING_HEALTH,
+                               "id": id})
+
+    with open(path, "w") as file:
+        json.dump({"name": "Stress", "width": width, "height": height, "map": board,
+                   "gold_mines": gold_mines, "trees": trees, "robots": robots}, file)
+
+
+class StressGame(Game):
+    """
+    A Game that stops after max_turns turns and times every turn.
+    """
+    def __init__(self, *args, max_turns=50, **kwargs):
+        self.max_turns = max_turns
+        self.turn_stats = Stats()
+        super().__init__(*args, **kwargs)
+
+    def run_turn(self):
+        start_time = time.perf_counter()
+        super().run_turn()
+        self.turn_stats.record("turn", (time.perf_counter() - start_time) * 1000)
+
+    def check_over(self):
+        super().check_over()
+        if self.turn >= self.max_turns:
+            self.going = False
+
+
+class Sampler:
+    """
+    Samples the resources used by this process and its children, in a
+    background thread, until stopped.
+    """
+    def __init__(self, game, interval=0.5):
+        self.game = game
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.interval)
+        self.sample()
+
+    def sample(self):
+        engine = psutil.Process()
+        children = engine.children(recursive=True)
+        rss = engine.memory_info().rss
+        for child in children:
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.samples.append({
+            "time": round(time.perf_counter() - self.start_time, 3),
+            "turn": self.game.turn,
+            "robots": len(self.game.registry.robots),
+            "processes": len(children),
+            "fds": engine.num_fds(),
+            "rss_mib": round(rss / 2 ** 20, 1),
+        })
+
+
+def run(red, blue, army, turns, width, height, **options):
+    """
+    Play one stress game and return its report.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = os.path.join(directory, "stress.wcm")
+        write_map(map_path, width, height, army)
+        red_dir = os.path.join(directory, "red")
+        blue_dir = os.path.join(directory, "blue")
+        write_bot(red_dir, red)
+        write_bot(blue_dir, blue)
+
+        setup_time = time.perf_counter()
+        game = StressGame(map_path, red_dir, blue_dir, max_turns=turns, **options)
+        setup_time = time.perf_counter() - setup_time
+
+        sampler = Sampler(game)
+        sampler.start()
+        start_time = time.perf_counter()
+        try:
+            winner = game.run()
+        finally:
+            elapsed = time.perf_counter() - start_time
+            sampler.stop()
+
+    turn_times = game.turn_stats.summary((50, 95, 99))["turn"]
+    return {
+        "red": red,
+        "blue": blue,
+        "army": army,
+        "map": "{}x{}".format(width, height),
+        "options": options,
+        "setup_seconds": setup_time,
+        "turns": game.turn,
+        "turns_per_second": game.turn / elapsed,
+        "turn_ms": turn_times,
+        "spawn_ms": game.stats.summary((50, 95, 99)).get("spawn"),
+        "winner": winner.to_string() if winner else None,
+        "peak": {
+            key: max(sample[key] for sample in sampler.samples)
+            for key in ("processes", "fds", "rss_mib")
+        },
+        "samples": sampler.samples,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--red", choices=sorted(BOTS), default="spam")
+    parser.add_argument("--blue", choices=sorted(BOTS), default="crasher")
+    parser.add_argument("--army", type=int, default=100, help="robots per team")
+    parser.add_argument("--turns", type=int, default=50, help="turns to play")
+    parser.add_argument("--width", type=int, default=80)
+    parser.add_argument("--height", type=int, default=40)
+    parser.add_argument("--cooperative", action="store_true")
+    parser.add_argument("--multiplex", action="store_true")
+    parser.add_argument("--zygote", action="store_true")
+    parser.add_argument("--output", help="file to write the report to instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.red, args.blue, args.army, args.turns, args.width, args.height,
+                 cooperative=args.cooperative, multiplex=args.multiplex, zygote=args.zygote)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import sys
+
+import protocol
+
+
+def turn(observation):
+    """
+    Decide what to do this turn.  Returns a list of actions.
+    """
+    return ["WAIT"]
+
+
+def write_line(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    # Started with --multiplex, one process plays every robot on the team, and
+    # each answer must start with the id of the robot it is for.
+    multiplex = "--multiplex" in sys.argv[1:]
+    decoder = protocol.Decoder()
+
+    # Block on stdin between turns.  The engine writes one observation at a
+    # time and expects one line of semicolon separated actions back.
+    while True:
+        message = decoder.read(sys.stdin.buffer)
+        if message is None:
+            break
+        if message.startswith(b"PROTOCOLS "):
+            decoder = protocol.Decoder(protocol.choose(message.decode().split()[1:]))
+            write_line("PROTOCOL " + decoder.protocol)
+            continue
+
+        id, observation = decoder.decode(message)
+        actions = ";".join(turn(observation)) if observation is not None else "RESYNC"
+        if multiplex:
+            actions = str(id) + " " + actions
+        write_line(actions)
+
+
+if __name__ == "__main__":
+    main()
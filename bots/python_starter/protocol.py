@@ -0,0 +1,239 @@
+from array import array
+import json
+import mmap
+import struct
+import sys
+
+# Protocols this bot understands, best first.
+SUPPORTED = ["delta", "binary", "shm", "json"]
+
+TYPES = ["ARCHER", "HORSE", "PEASANT", "PIKE", "HOUSE"]
+TEAMS = ["RED", "BLUE"]
+
+# In observations decoded from the binary protocol, the squares of the map
+# that are not ids are these numbers instead of " ", "W", and "?".
+EMPTY = 0
+WALL = -1
+UNKNOWN = -2
+
+_LENGTH = struct.Struct("<I")
+_HEADER = struct.Struct("<iHH")
+_COUNTS = struct.Struct("<HHH")
+_RESOURCE = struct.Struct("<HHii")
+_ROBOT = struct.Struct("<HHBBii")
+_SEGMENT_HEADER = struct.Struct("<QI")
+
+# Fields of the trees, gold mines, and robots returned by view_binary.
+RESOURCE_FIELDS = [("x", "<u2"), ("y", "<u2"), ("health", "<i4"), ("id", "<i4")]
+ROBOT_FIELDS = [("x", "<u2"), ("y", "<u2"), ("type", "u1"), ("team", "u1"),
+                ("health", "<i4"), ("id", "<i4")]
+
+
+def choose(offered):
+    """
+    Pick the protocol to use from the ones the engine offered.
+    """
+    for protocol in SUPPORTED:
+        if protocol in offered:
+            return protocol
+    return "json"
+
+
+def decode_binary(data):
+    """
+    Decode an observation sent with the binary protocol (without its length).
+    The map holds ids and the numbers EMPTY, WALL, and UNKNOWN.
+    """
+    id, width, height = _HEADER.unpack_from(data, 0)
+    offset = _HEADER.size
+    squares = array("i")
+    squares.frombytes(data[offset:offset + 4 * width * height])
+    offset += 4 * width * height
+    squares = squares.tolist()
+    board = [squares[y * width:(y + 1) * width] for y in range(height)]
+
+    tree_count, gold_mine_count, robot_count = _COUNTS.unpack_from(data, offset)
+    offset += _COUNTS.size
+    end = offset + _RESOURCE.size * (tree_count + gold_mine_count)
+    resources = [
+        {"x": x, "y": y, "health": health, "id": id2}
+        for x, y, health, id2 in _RESOURCE.iter_unpack(data[offset:end])
+    ]
+    offset = end
+    end = offset + _ROBOT.size * robot_count
+    robots = [
+        {"x": x, "y": y, "type": TYPES[type], "team": TEAMS[team], "health": health, "id": id2}
+        for x, y, type, team, health, id2 in _ROBOT.iter_unpack(data[offset:end])
+    ]
+
+    return {
+        "id": id,
+        "map": board,
+        "trees": resources[:tree_count],
+        "gold_mines": resources[tree_count:],
+        "robots": robots,
+    }
+
+
+def view_binary(buffer, offset=0):
+    """
+    Like decode_binary, but instead of copying, returns numpy arrays that look
+    straight into buffer:  "map" is a (height, width) int32 array, and
+    "trees", "gold_mines", and "robots" are structured arrays with the fields
+    RESOURCE_FIELDS and ROBOT_FIELDS.  Robots' types and teams are indexes
+    into TYPES and TEAMS.
+    """
+    # Only imported here, since importing numpy slows down starting the bot.
+    import numpy
+    RESOURCE_DTYPE = numpy.dtype(RESOURCE_FIELDS)
+    ROBOT_DTYPE = numpy.dtype(ROBOT_FIELDS)
+
+    id, width, height = _HEADER.unpack_from(buffer, offset)
+    offset += _HEADER.size
+    board = numpy.frombuffer(buffer, numpy.int32, width * height, offset).reshape(height, width)
+    offset += 4 * width * height
+
+    tree_count, gold_mine_count, robot_count = _COUNTS.unpack_from(buffer, offset)
+    offset += _COUNTS.size
+    trees = numpy.frombuffer(buffer, RESOURCE_DTYPE, tree_count, offset)
+    offset += RESOURCE_DTYPE.itemsize * tree_count
+    gold_mines = numpy.frombuffer(buffer, RESOURCE_DTYPE, gold_mine_count, offset)
+    offset += RESOURCE_DTYPE.itemsize * gold_mine_count
+    robots = numpy.frombuffer(buffer, ROBOT_DTYPE, robot_count, offset)
+
+    return {
+        "id": id,
+        "map": board,
+        "trees": trees,
+        "gold_mines": gold_mines,
+        "robots": robots,
+    }
+
+
+class SharedReader:
+    """
+    Reads observations the engine writes to shared memory for the shm
+    protocol.
+    """
+    def __init__(self, zero_copy=None):
+        """
+        zero_copy:  whether to return numpy views of the segment (see
+                view_binary) instead of copies.  By default they are used if
+                the bot has imported numpy by the time it reads, since
+                importing it just for this can use up the first turn.
+        """
+        self.path = None
+        self.file = None
+        self.memory = None
+        self.zero_copy = zero_copy
+
+    def read(self, path, generation):
+        """
+        Returns the observation in the segment at path.  With numpy, it is a
+        view_binary of the segment, which is only valid until the engine's next
+        message; without numpy it is copied out with decode_binary.  Returns
+        None if the segment holds a newer observation than the one asked for,
+        which happens when the engine timed the robot out; the robot should
+        then RESYNC.
+        """
+        if path != self.path:
+            self.close()
+            self.path = path
+            self.file = open(path, "rb")
+        written_generation, length = _SEGMENT_HEADER.unpack(
+            self.file.read(_SEGMENT_HEADER.size) if self.memory is None else
+            self.memory[:_SEGMENT_HEADER.size])
+        if self.memory is None or _SEGMENT_HEADER.size + length > len(self.memory):
+            # The engine made the segment bigger, so map it again.
+            if self.memory is not None:
+                self.memory.close()
+            self.file.seek(0)
+            self.memory = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            written_generation, length = _SEGMENT_HEADER.unpack_from(self.memory, 0)
+        if written_generation != generation:
+            # The engine gave up waiting for this message's answer and has
+            # already written a later robot's observation.
+            return None
+
+        zero_copy = self.zero_copy if self.zero_copy is not None else "numpy" in sys.modules
+        if zero_copy:
+            return view_binary(self.memory, _SEGMENT_HEADER.size)
+        return decode_binary(self.memory[_SEGMENT_HEADER.size:_SEGMENT_HEADER.size + length])
+
+    def close(self):
+        if self.memory is not None:
+            self.memory.close()
+            self.memory = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Decoder:
+    """
+    Reads what the engine writes to stdin and turns it back into full
+    observations, remembering what each robot saw last for the delta protocol.
+    """
+    def __init__(self, protocol="json"):
+        self.protocol = protocol
+        self.robots = {}
+        self.shared = SharedReader() if protocol == "shm" else None
+
+    def read(self, stream):
+        """
+        Read the next message from a binary stream (sys.stdin.buffer).
+        Returns None at the end of the stream.
+        """
+        if self.protocol != "binary":
+            return stream.readline() or None
+        header = stream.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            return None
+        return stream.read(_LENGTH.unpack(header)[0])
+
+    def decode(self, message):
+        """
+        Returns (robot id, observation).  The observation is None if a delta
+        could not be applied, in which case the robot should RESYNC.
+        """
+        if self.protocol == "binary":
+            observation = decode_binary(message)
+            return observation["id"], observation
+
+        message = json.loads(message)
+        id = message["id"]
+        if self.protocol == "shm":
+            return id, self.shared.read(message["segment"], message["generation"])
+        if self.protocol != "delta":
+            return id, message
+
+        if message["full"]:
+            observation = {
+                "id": id,
+                "map": message["map"],
+                "trees": message["trees"],
+                "gold_mines": message["gold_mines"],
+                "robots": message["robots"],
+            }
+            self.robots[id] = (message["seq"], observation, {
+                key: {entity["id"]: entity for entity in message[key]}
+                for key in ("trees", "gold_mines", "robots")
+            })
+            return id, observation
+
+        if id not in self.robots or self.robots[id][0] + 1 != message["seq"]:
+            self.robots.pop(id, None)
+            return id, None
+
+        _, observation, entities = self.robots[id]
+        for x, y, square in message["tiles"]:
+            observation["map"][y][x] = square
+        for id2 in message["removed"]:
+            for known in entities.values():
+                known.pop(id2, None)
+        for key, known in entities.items():
+            for entity in message[key]:
+                known[entity["id"]] = entity
+            observation[key] = list(known.values())
+        self.robots[id] = (message["seq"], observation, entities)
+        return id, observation
@@ -0,0 +1,78 @@
+"""
+Games for the tests, whose robots run a script instead of a bot's code.
+"""
+import random
+
+from warcode.engine.game import Game
+from warcode.engine.player import HeadlessPlayer
+
+
+class ScriptedGame(Game):
+    """
+    A Game whose robots are all HeadlessPlayers running the same script.
+    """
+    def __init__(self, map_name, script=None, **kwargs):
+        self.script = script
+        super().__init__(map_name, None, None, **kwargs)
+
+    def create_player(self, robot):
+        return HeadlessPlayer(robot, self.script)
+
+
+def _step(start, goal):
+    """
+    Returns the square one step from start towards goal.
+    """
+    return tuple(a + (b > a) - (b < a) for a, b in zip(start, goal))
+
+
+def _distance(robot, entity):
+    return max(abs(entity["x"] - robot["x"]), abs(entity["y"] - robot["y"]))
+
+
+def random_script(observation):
+    """
+    Plays a simple game:  houses build peasants, peasants gather wood and gold
+    and sometimes train, and the others walk up to the nearest enemy and
+    attack it.  Random, often illegal, actions are mixed in, picked with the
+    observation as the seed so that the same game always plays out the same
+    way.
+    """
+    rng = random.Random(repr(observation))
+    me = next(robot for robot in observation["robots"] if robot["id"] == observation["id"])
+    position = (me["x"], me["y"])
+    x, y = me["x"] + rng.randint(-1, 1), me["y"] + rng.randint(-1, 1)
+    actions = [rng.choice(["WAIT", "MOVE {} {}".format(x, y), "TRAIN HOUSE", "DANCE"])]
+    if rng.random() < 0.01:
+        actions.append("EXPLODE")
+
+    if me["type"] == "HOUSE":
+        actions.append("BUILD {} {} PEASANT".format(x, y))
+    elif me["type"] == "PEASANT":
+        resources = ([("CUT", tree) for tree in observation["trees"]]
+                     + [("MINE", gold_mine) for gold_mine in observation["gold_mines"]])
+        if resources:
+            kind, resource = min(resources, key=lambda pair: _distance(me, pair[1]))
+            actions.append("{} {}".format(kind, resource["id"]))
+            actions.append("MOVE {} {}".format(*_step(position, (resource["x"], resource["y"]))))
+        actions.append("TRAIN " + rng.choice(["ARCHER", "HORSE", "PIKE"]))
+        actions.append("BUILD {} {} HOUSE".format(x, y))
+    else:
+        enemies = [robot for robot in observation["robots"] if robot["team"] != me["team"]]
+        if enemies:
+            enemy = min(enemies, key=lambda robot: _distance(me, robot))
+            actions.append("ATTACK {} {}".format(enemy["x"], enemy["y"]))
+            actions.append("MOVE {} {}".format(*_step(position, (enemy["x"], enemy["y"]))))
+    rng.shuffle(actions)
+    return ";".join(actions)
+
+
+def play(game, until=None):
+    """
+    Play a game's turns until it ends, or until turn until has been played.
+    Unlike Game.run, this does not close the game.
+    """
+    game.going = True
+    while game.going and (until is None or game.turn < until):
+        game.turn += 1
+        game.run_turn()
@@ -0,0 +1,79 @@
+import unittest
+
+from warcode.common import GameConstants, Type
+from warcode.engine.actions import parse_action, parse_actions
+
+from .scripted_game import ScriptedGame
+
+
+class ParseActionTest(unittest.TestCase):
+    def test_arguments_are_converted(self):
+        self.assertEqual(parse_action("MOVE 3 4"), ("MOVE 3 4", "move", (3, 4)))
+        self.assertEqual(parse_action("BUILD 1 2 HOUSE"),
+                         ("BUILD 1 2 HOUSE", "build", (1, 2, Type.HOUSE)))
+        self.assertEqual(parse_action("TRAIN PIKE"), ("TRAIN PIKE", "train", (Type.PIKE,)))
+        self.assertEqual(parse_action("EXPLODE"), ("EXPLODE", "kill", ()))
+
+    def test_extra_words_are_ignored(self):
+        self.assertEqual(parse_action("CUT 7 now please"), ("CUT 7 now please", "cut", (7,)))
+
+    def test_bad_actions_have_no_handler(self):
+        for text in ("", "   ", "DANCE", "move 1 2", "MOVE", "MOVE 1", "MOVE 1 two",
+                     "ATTACK 1.5 2", "BUILD 1 2 CASTLE", "TRAIN", "MINE x"):
+            self.assertEqual(parse_action(text), (text, None, ()), text)
+
+
+class ParseActionsTest(unittest.TestCase):
+    def test_empty_actions_are_skipped(self):
+        actions, ignored = parse_actions(";WAIT;; ;MOVE 1 2;")
+        self.assertEqual([handler for _, handler, _ in actions], ["wait", "move"])
+        self.assertFalse(ignored)
+
+    def test_bad_actions_are_kept(self):
+        actions, ignored = parse_actions("WAIT;DANCE;MOVE 1")
+        self.assertEqual(actions, (("WAIT", "wait", ()), ("DANCE", None, ()),
+                                   ("MOVE 1", None, ())))
+        self.assertFalse(ignored)
+
+    def test_limit(self):
+        limit = GameConstants.MAX_ACTIONS_PER_TURN
+        actions, ignored = parse_actions(";".join(["WAIT"] * limit))
+        self.assertEqual(len(actions), limit)
+        self.assertFalse(ignored)
+
+        actions, ignored = parse_actions(";".join(["WAIT"] * (limit + 1)))
+        self.assertEqual(len(actions), limit)
+        self.assertTrue(ignored)
+
+        actions, ignored = parse_actions("WAIT;WAIT;MOVE 1 2;EXPLODE", 2)
+        self.assertEqual(len(actions), 2)
+        self.assertTrue(ignored)
+
+    def test_nothing_after_the_limit(self):
+        actions, ignored = parse_actions("WAIT;WAIT;;", 2)
+        self.assertEqual(len(actions), 2)
+        self.assertFalse(ignored)
+
+    def test_long_lines(self):
+        # Lines this long are not cached, but are parsed the same way.
+        line = ";".join(["MOVE 10 20"] * 500)
+        actions, ignored = parse_actions(line)
+        self.assertEqual(actions, (("MOVE 10 20", "move", (10, 20)),)
+                         * GameConstants.MAX_ACTIONS_PER_TURN)
+        self.assertTrue(ignored)
+
+
+class ProcessActionsTest(unittest.TestCase):
+    def test_actions_after_the_limit_are_not_taken(self):
+        game = ScriptedGame("Tiny", seed=0)
+        first, second = list(game.players.values())[:2]
+        waits = ["WAIT"] * (GameConstants.MAX_ACTIONS_PER_TURN - 1)
+
+        game.process_actions(";".join(waits + ["WAIT", "EXPLODE"]), first)
+        self.assertGreater(first.robot.health, 0)
+        game.process_actions(";".join(waits + ["EXPLODE"]), second)
+        self.assertLessEqual(second.robot.health, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import filecmp
+import glob
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from warcode.common.binary_map import decode_map, encode_map, read_binary_map
+from warcode.common.map import load_map, read_map_data
+from warcode.map_creator.convert import convert
+
+_map_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "resources", "maps")
+
+
+class BinaryMapTest(unittest.TestCase):
+    def setUp(self):
+        self.paths = sorted(glob.glob(os.path.join(_map_dir, "*.wcm")))
+        self.assertTrue(self.paths)
+
+    def test_decode_gives_back_the_data(self):
+        for path in self.paths:
+            data = read_map_data(path)
+            decoded = decode_map(encode_map(data))
+            self.assertEqual(decoded.to_dict(), data, path)
+            self.assertEqual(encode_map(decoded), encode_map(data), path)
+
+    def test_entities_are_decoded_lazily(self):
+        data = decode_map(encode_map(read_map_data(self.paths[0])))
+        self.assertEqual(data.decoded, {})
+        data["robots"]
+        self.assertEqual(list(data.decoded), ["robots"])
+        with self.assertRaises(KeyError):
+            data["rivers"]
+
+    def test_files_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for path in self.paths:
+                source = shutil.copy(path, directory)
+                binary = convert(source)
+                self.assertTrue(binary.endswith(".wcmb"))
+                self.assertEqual(read_binary_map(binary).to_dict(), read_map_data(path))
+
+                text = convert(binary, os.path.join(directory, "back.wcm"))
+                self.assertTrue(filecmp.cmp(text, path, shallow=False), path)
+
+                # The game loads the same map from either file.
+                expected = load_map(path)
+                loaded = load_map(binary)
+                self.assertEqual(loaded[0].to_dict(), expected[0].to_dict())
+                for entities, expected_entities in zip(loaded[1:], expected[1:]):
+                    self.assertEqual({id: entity.to_dict() for id, entity in entities.items()},
+                                     {id: entity.to_dict()
+                                      for id, entity in expected_entities.items()})
+
+    def test_bad_data(self):
+        data = encode_map(read_map_data(self.paths[0]))
+        with self.assertRaises(ValueError):
+            decode_map(b"WCMJ" + data[4:])
+        with self.assertRaises(ValueError):
+            decode_map(data[:4] + b"\x7f" + data[5:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import copy
+import importlib.util
+import json
+import os.path
+import unittest
+
+from warcode.engine.protocol import DeltaProtocol, JsonProtocol
+
+from .scripted_game import ScriptedGame, play, random_script
+
+_starter_protocol = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "bots", "python_starter", "protocol.py")
+
+
+def load_starter_protocol():
+    """
+    Import the starter bot's protocol.py, which decodes what the engine sends.
+    """
+    spec = importlib.util.spec_from_file_location("starter_protocol", _starter_protocol)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def by_id(entities):
+    return sorted(entities, key=lambda entity: entity["id"])
+
+
+class ObservationRecorder(ScriptedGame):
+    """
+    A ScriptedGame that keeps a copy of every observation its robots get.
+    """
+    def __init__(self, *args, **kwargs):
+        self.observations = []
+        super().__init__(*args, **kwargs)
+
+    def get_observation(self, robot):
+        observation = super().get_observation(robot)
+        self.observations.append(copy.deepcopy(observation))
+        return observation
+
+
+class DeltaProtocolTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.starter = load_starter_protocol()
+        game = ObservationRecorder("Basic", random_script, seed=3)
+        play(game, 100)
+        cls.observations = game.observations
+
+    def assertDecodes(self, decoded, observation):
+        self.assertEqual(decoded["map"], observation["map"])
+        for key in ("trees", "gold_mines", "robots"):
+            self.assertEqual(by_id(decoded[key]), by_id(observation[key]), key)
+
+    def test_round_trip(self):
+        protocols = {}
+        decoder = self.starter.Decoder("delta")
+        deltas = removed = 0
+        for observation in self.observations:
+            protocol = protocols.setdefault(observation["id"], DeltaProtocol())
+            message = protocol.encode(observation)
+            sent = json.loads(message.decode())
+            deltas += not sent["full"]
+            removed += len(sent.get("removed", ()))
+            id, decoded = decoder.decode(message.decode())
+            self.assertEqual(id, observation["id"])
+            self.assertDecodes(decoded, observation)
+        self.assertGreater(deltas, len(protocols))
+        self.assertGreater(removed, 0)
+
+    def test_resync(self):
+        observations = [observation for observation in self.observations
+                        if observation["id"] == self.observations[0]["id"]]
+        protocol = DeltaProtocol()
+        decoder = self.starter.Decoder("delta")
+        decoder.decode(protocol.encode(observations[0]).decode())
+
+        # A message the player never got makes the next delta unusable.
+        protocol.encode(observations[1])
+        id, decoded = decoder.decode(protocol.encode(observations[2]).decode())
+        self.assertIsNone(decoded)
+
+        protocol.resync()
+        message = protocol.encode(observations[3])
+        self.assertTrue(json.loads(message.decode())["full"])
+        id, decoded = decoder.decode(message.decode())
+        self.assertDecodes(decoded, observations[3])
+        id, decoded = decoder.decode(protocol.encode(observations[4]).decode())
+        self.assertDecodes(decoded, observations[4])
+
+    def test_json(self):
+        decoder = self.starter.Decoder("json")
+        for observation in self.observations[:20]:
+            id, decoded = decoder.decode(JsonProtocol().encode(observation).decode())
+            self.assertEqual(decoded, observation)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from warcode.common import GoldMine, Robot, Team, Tree, Type
+from warcode.engine.registry import EntityRegistry
+
+from .scripted_game import ScriptedGame, random_script
+
+
+class EntityRegistryTest(unittest.TestCase):
+    def assertConsistent(self, registry):
+        """
+        Check the per-team and per-type views and totals against the robots.
+        """
+        robots = registry.robots
+        for team in Team:
+            self.assertEqual(registry.robots_by_team[team],
+                             {id: robot for id, robot in robots.items() if robot.team is team})
+            self.assertEqual(registry.team_health[team],
+                             sum(robot.health for robot in robots.values() if robot.team is team))
+            self.assertEqual(registry.count(team), len(registry.robots_by_team[team]))
+        for type in Type.ALL_TYPES:
+            self.assertEqual(registry.robots_by_type[type],
+                             {id: robot for id, robot in robots.items() if robot.type is type})
+
+    def test_changes(self):
+        tree = Tree(0, 0, id=1)
+        gold_mine = GoldMine(1, 0, id=2)
+        peasant = Robot(2, 0, Type.PEASANT, Team.RED, id=3)
+        archer = Robot(3, 0, Type.ARCHER, Team.BLUE, id=4)
+        registry = EntityRegistry([tree], [gold_mine], [peasant, archer])
+        self.assertConsistent(registry)
+        self.assertIs(registry.get(1), tree)
+        self.assertIs(registry.get(2), gold_mine)
+        self.assertIs(registry.get(3), peasant)
+        self.assertIsNone(registry.get(5))
+        self.assertIn(4, registry)
+        self.assertNotIn(5, registry)
+
+        registry.set_health(peasant, peasant.health - 3)
+        registry.set_type(peasant, Type.PIKE)
+        self.assertConsistent(registry)
+
+        registry.remove(archer)
+        registry.remove(archer)
+        registry.remove(tree)
+        self.assertConsistent(registry)
+        self.assertNotIn(4, registry)
+        self.assertNotIn(1, registry)
+        self.assertEqual(registry.count(Team.BLUE), 0)
+
+        # Changes to robots that are no longer registered leave the totals be.
+        registry.set_health(archer, 1)
+        registry.set_type(archer, Type.HORSE)
+        self.assertConsistent(registry)
+
+        with self.assertRaises(TypeError):
+            registry.add("robot")
+
+    def test_consistent_through_a_game(self):
+        game = ScriptedGame("Tiny", random_script, seed=2)
+        self.assertConsistent(game.registry)
+        game.going = True
+        while game.going:
+            game.turn += 1
+            game.run_turn()
+            self.assertConsistent(game.registry)
+            self.assertEqual(set(game.registry.robots), set(game.players))
+            for robot in game.registry.robots.values():
+                self.assertEqual(game.map.board[robot.y][robot.x], robot.id)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os.path
+import tempfile
+import unittest
+
+from warcode.engine.replay import read_replay
+
+from .scripted_game import ScriptedGame
+
+
+class ReplayTest(unittest.TestCase):
+    def test_death_is_replayed(self):
+        exploded = []
+
+        def script(observation):
+            if not exploded:
+                exploded.append(observation["id"])
+                return "EXPLODE"
+            return "WAIT"
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.wcr")
+            game = ScriptedGame("Tiny", script, replay=path, seed=0)
+            robots = len(game.registry.robots)
+            game.going = True
+            for turn in (1, 2):
+                game.turn = turn
+                game.run_turn()
+            game.close()
+
+            header, states = read_replay(path)
+            states = {turn: (actions, state) for turn, actions, state in states}
+
+        dead = str(exploded[0])
+        self.assertEqual(states[0][0], [])
+        self.assertIn(dead, states[0][1]["robots"])
+        self.assertEqual(states[1][0][0], [exploded[0], "EXPLODE"])
+        for turn in (1, 2):
+            self.assertEqual(len(states[turn][1]["robots"]), robots - 1)
+            self.assertNotIn(dead, states[turn][1]["robots"])
+
+
+if __name__ == "__main__":
+    unittest.main()
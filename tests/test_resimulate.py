@@ -0,0 +1,61 @@
+import gzip
+import json
+import os.path
+import tempfile
+import unittest
+
+from warcode.common.errors import GameException
+from warcode.engine.action_log import read_action_log
+from warcode.engine.resimulate import resimulate
+
+from .scripted_game import ScriptedGame, random_script
+
+
+class ResimulateTest(unittest.TestCase):
+    def play_logged(self, directory, seed):
+        path = os.path.join(directory, "game.log.gz")
+        game = ScriptedGame("Tiny", random_script, action_log=path, seed=seed)
+        return path, game.run()
+
+    def test_winner_is_reproduced(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for seed in (1, 2, 3):
+                path, winner = self.play_logged(directory, seed)
+                self.assertEqual(resimulate(path), winner)
+                self.assertEqual(resimulate(path, array_map=True), winner)
+
+    def rewrite(self, path, change):
+        """
+        Apply change to every record of an action log.
+        """
+        with gzip.open(path, "rt") as f:
+            records = [json.loads(line) for line in f]
+        with gzip.open(path, "wt") as f:
+            for record in records:
+                change(record)
+                f.write(json.dumps(record) + "\n")
+
+    def test_changed_actions_are_caught(self):
+        def wait_first(record):
+            if record.get("turn") == 1 and record["type"] == "turn":
+                record["actions"] = [[id, "WAIT"] for id, _ in record["actions"]]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path, _ = self.play_logged(directory, 1)
+            self.rewrite(path, wait_first)
+            with self.assertRaises(GameException):
+                resimulate(path)
+
+    def test_other_versions_are_rejected(self):
+        def bump_version(record):
+            if record["type"] == "header":
+                record["version"] += 1
+
+        with tempfile.TemporaryDirectory() as directory:
+            path, _ = self.play_logged(directory, 1)
+            self.rewrite(path, bump_version)
+            with self.assertRaises(GameException):
+                read_action_log(path)
+
+if __name__ == "__main__":
+    unittest.main()
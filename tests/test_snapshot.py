@@ -0,0 +1,35 @@
+import unittest
+
+from .scripted_game import ScriptedGame, play, random_script
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_restore_plays_out_the_same(self):
+        for array_map in (False, True):
+            expected = ScriptedGame("Basic", random_script, seed=3, array_map=array_map)
+            play(expected)
+
+            game = ScriptedGame("Basic", random_script, seed=3, array_map=array_map)
+            play(game, 60)
+            snapshot = game.snapshot()
+            state = game.state_hash()
+            turns_taken = {id: player.turns_taken for id, player in game.players.items()}
+            play(game)
+            self.assertEqual(game.state_hash(), expected.state_hash())
+
+            # Restoring twice checks that playing on does not change the snapshot.
+            for _ in range(2):
+                game.restore(snapshot)
+                self.assertEqual(game.state_hash(), state)
+                self.assertEqual({id: player.turns_taken for id, player in game.players.items()},
+                                 turns_taken)
+                for robot in game.registry.robots.values():
+                    self.assertEqual(game.map.board[robot.y][robot.x], robot.id)
+                play(game)
+                self.assertEqual(game.turn, expected.turn)
+                self.assertEqual(game.state_hash(), expected.state_hash())
+                self.assertEqual(game.get_winner(), expected.get_winner())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 from . import errors
+from .array_map import ArrayMap
 from .game_constants import GameConstants
 from .gold_mine import GoldMine
 from .map import Map, load_map
+from .map_registry import MapRegistry, map_registry
 from .robot import Robot
 from .team import Team
 from .tree import Tree
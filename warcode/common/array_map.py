@@ -0,0 +1,225 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .disc import disc_offsets
+from .map import Map
+
+class ArrayMap(Map):
+    """
+    A Map stored as two numpy arrays instead of a list of lists:  an int32 grid
+    of ids and a uint8 grid of what kind of thing is on each square.  Whole-map
+    operations are single numpy calls.
+
+    self.board is a view that can still be read and written as board[y][x]
+    with the usual " ", "W", and id values.
+    """
+    EMPTY = 0
+    WALL = 1
+    TREE = 2
+    GOLD_MINE = 3
+    ROBOT = 4
+    UNKNOWN = 255
+
+    def __init__(self, width, height, board, name=None, trees=(), gold_mines=()):
+        """
+        width -- width of the map
+        height -- height of the map
+        board -- 2d array of things at different locations, as for a Map
+        trees -- ids of the trees on the board
+        gold_mines -- ids of the gold mines on the board
+
+        Any other id on the board is taken to be a robot.
+        """
+        if numpy is None:
+            raise ImportError("numpy is needed to use an ArrayMap.")
+
+        self.width = width
+        self.height = height
+        self.name = name or "Unnamed Map"
+        self.kind_of_id = {}
+        for id in trees:
+            self.kind_of_id[id] = ArrayMap.TREE
+        for id in gold_mines:
+            self.kind_of_id[id] = ArrayMap.GOLD_MINE
+
+        self.ids = numpy.zeros((height, width), dtype=numpy.int32)
+        self.kinds = numpy.zeros((height, width), dtype=numpy.uint8)
+        for y, row in enumerate(board):
+            for x, square in enumerate(row):
+                self.set(x, y, square)
+
+        # Coordinates of every square, for building masks.
+        self.ys, self.xs = numpy.indices((height, width))
+        self.board = BoardView(self)
+
+    @classmethod
+    def from_map(cls, map, trees=(), gold_mines=()):
+        """
+        Make an ArrayMap with the same contents as a Map.
+        """
+        return cls(map.width, map.height, map.board, map.name, trees, gold_mines)
+
+    def get(self, x, y):
+        """
+        Returns what is at (x, y):  " ", "W", or an id.
+        """
+        kind = self.kinds[y, x]
+        if kind == ArrayMap.EMPTY:
+            return " "
+        if kind == ArrayMap.WALL:
+            return "W"
+        return int(self.ids[y, x])
+
+    def set(self, x, y, square):
+        """
+        Put " ", "W", or an id at (x, y).
+        """
+        if square == " " or square is None:
+            self.ids[y, x] = 0
+            self.kinds[y, x] = ArrayMap.EMPTY
+        elif square == "W":
+            self.ids[y, x] = 0
+            self.kinds[y, x] = ArrayMap.WALL
+        else:
+            self.ids[y, x] = square
+            self.kinds[y, x] = self.kind_of_id.get(square, ArrayMap.ROBOT)
+
+    def squares_in_disc(self, x, y, radius):
+        # Only the squares in the disc are looked at, as in Map, rather than
+        # building a mask of the whole map.
+        for dx, dy in disc_offsets(radius):
+            x2, y2 = x + dx, y + dy
+            if 0 <= x2 < self.width and 0 <= y2 < self.height:
+                yield x2, y2, self.get(x2, y2)
+
+    def is_empty(self, x, y):
+        return self.kinds[y, x] == ArrayMap.EMPTY
+
+    def empty_mask(self):
+        """
+        Returns a boolean array that is True on every empty square.
+        """
+        return self.kinds == ArrayMap.EMPTY
+
+    def disc_mask(self, x, y, radius):
+        """
+        Returns a boolean array that is True on every square within the
+        distance squared radius of (x, y).
+        """
+        return (self.xs - x) ** 2 + (self.ys - y) ** 2 <= radius
+
+    def neighbourhood(self, x, y, radius):
+        """
+        Returns (ids, kinds) of the squares within the distance squared radius
+        of (x, y), with every other square's kind set to UNKNOWN and id to 0.
+        """
+        return self.fog(self.disc_mask(x, y, radius))
+
+    def fog(self, visible):
+        """
+        Returns (ids, kinds) with every square where the boolean array visible
+        is False hidden:  its kind set to UNKNOWN and its id to 0.
+        """
+        return (numpy.where(visible, self.ids, 0),
+                numpy.where(visible, self.kinds, ArrayMap.UNKNOWN).astype(numpy.uint8))
+
+    def square_indices(self, squares):
+        """
+        Returns arrays (ys, xs) of the coordinates of squares, a sequence of
+        (x, y), for indexing self.ids and self.kinds.
+        """
+        xs, ys = numpy.array(squares, dtype=numpy.intp).reshape(-1, 2).T
+        return ys, xs
+
+    def visible_board(self, vision):
+        # Only the visible squares are looked at, as in Map.
+        board = [["?"] * self.width for _ in range(self.height)]
+        ys, xs = vision.indices
+        kinds = self.kinds[ys, xs]
+        squares = self.ids[ys, xs].astype(object)
+        squares[kinds == ArrayMap.EMPTY] = " "
+        squares[kinds == ArrayMap.WALL] = "W"
+        for (x, y), square in zip(vision.squares, squares.tolist()):
+            board[y][x] = square
+        return board
+
+    def visible_ids(self, vision):
+        ys, xs = vision.indices
+        return self.ids[ys, xs][self.kinds[ys, xs] >= ArrayMap.TREE].tolist()
+
+    def to_list(self):
+        """
+        Returns the board as a list of lists, as a Map stores it.
+        """
+        board = self.ids.astype(object)
+        board[self.kinds == ArrayMap.EMPTY] = " "
+        board[self.kinds == ArrayMap.WALL] = "W"
+        return board.tolist()
+
+    def to_dict(self):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "board": self.to_list(),
+            "name": self.name,
+        }
+
+    def copy(self):
+        map = ArrayMap.__new__(ArrayMap)
+        map.width = self.width
+        map.height = self.height
+        map.name = self.name
+        map.kind_of_id = dict(self.kind_of_id)
+        map.ids = self.ids.copy()
+        map.kinds = self.kinds.copy()
+        map.ys, map.xs = self.ys, self.xs
+        map.board = BoardView(map)
+        return map
+
+
+class BoardView:
+    """
+    Lets an ArrayMap be indexed like a list of lists, board[y][x].
+    """
+    def __init__(self, map):
+        self.map = map
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.map.height:
+            raise IndexError("board row out of range")
+        return RowView(self.map, y)
+
+    def __len__(self):
+        return self.map.height
+
+    def __iter__(self):
+        for y in range(self.map.height):
+            yield RowView(self.map, y)
+
+
+class RowView:
+    """
+    One row of a BoardView.
+    """
+    def __init__(self, map, y):
+        self.map = map
+        self.y = y
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.map.width:
+            raise IndexError("board column out of range")
+        return self.map.get(x, self.y)
+
+    def __setitem__(self, x, square):
+        if not 0 <= x < self.map.width:
+            raise IndexError("board column out of range")
+        self.map.set(x, self.y, square)
+
+    def __len__(self):
+        return self.map.width
+
+    def __iter__(self):
+        for x in range(self.map.width):
+            yield self.map.get(x, self.y)
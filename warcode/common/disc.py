@@ -0,0 +1,18 @@
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def disc_offsets(radius):
+    """
+    Returns a tuple of every offset (dx, dy) with dx ** 2 + dy ** 2 <= radius.
+    Like every radius in the game, radius is a distance squared.  A negative
+    radius gives no offsets.
+    """
+    if radius < 0:
+        return ()
+    reach = int(radius ** 0.5)
+    return tuple(
+        (dx, dy)
+        for dy in range(-reach, reach + 1)
+        for dx in range(-reach, reach + 1)
+        if dx * dx + dy * dy <= radius
+    )
@@ -17,6 +17,10 @@ class GameConstants:
     ])
 
     STARTING_GOLD = 0
+    STARTING_WOOD = 0
 
     CUT_AMOUNT = 10
     MINE_AMOUNT = 10
+
+    # Actions after this many in a robot's turn are ignored.
+    MAX_ACTIONS_PER_TURN = 100
@@ -2,21 +2,53 @@ import random
 
 from .game_constants import GameConstants
 
-_ids_given = set()
-
-def add_id(id):
+class IdAllocator:
     """
-    Add an id to our set of id's given.
+    Hands out random, unique ids.  Two allocators made with the same seed
+    that are told about the same ids hand out the same ids in the same order.
     """
-    _ids_given.add(id)
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+        self.ids_given = set()
+
+    def add_id(self, id):
+        """
+        Add an id to our set of id's given.
+        """
+        self.ids_given.add(id)
+
+    def random_id(self):
+        """
+        Returns a new, random, unique id.
+        """
+        while True:
+            id = self.random.randint(1, GameConstants.MAX_ID)
+            if id not in self.ids_given:
+                break
+        self.add_id(id)
+        return id
+
+    def getstate(self):
+        """
+        Returns the allocator's state, for setstate.
+        """
+        return self.random.getstate(), frozenset(self.ids_given)
+
+    def setstate(self, state):
+        """
+        Put the allocator back in a state returned by getstate.
+        """
+        random_state, ids_given = state
+        self.random.setstate(random_state)
+        self.ids_given = set(ids_given)
+
 
-def random_id():
+def choose_id(id, ids):
     """
-    Returns a new, random, (almost certainly) unique id.
+    Returns id, or if it is None, a new id drawn from ids, an IdAllocator.
     """
-    for i in range(10):
-        id = random.randint(1, GameConstants.MAX_ID)
-        if id not in _ids_given:
-            break
-    add_id(id)
-    return id
+    if id is not None:
+        return id
+    if ids is None:
+        raise ValueError("An id or an IdAllocator to draw one from is needed.")
+    return ids.random_id()
@@ -1,6 +1,8 @@
 import os.path
 import json
 
+from .binary_map import read_binary_map
+from .disc import disc_offsets
 from .tree import Tree
 from .gold_mine import GoldMine
 from .robot import Robot
@@ -25,9 +27,43 @@ class Map:
         self.board = board
         self.name = name or "Unnamed Map"
 
-    def is_on_the_map(x, y):
+    def is_on_the_map(self, x, y):
         return 0 <= x < self.width and 0 <= y < self.height
 
+    def squares_in_disc(self, x, y, radius):
+        """
+        Yields every (x, y, square) on the map within the distance squared
+        radius of (x, y).
+        """
+        for dx, dy in disc_offsets(radius):
+            x2, y2 = x + dx, y + dy
+            if 0 <= x2 < self.width and 0 <= y2 < self.height:
+                yield x2, y2, self.board[y2][x2]
+
+    def visible_board(self, vision):
+        """
+        Returns a copy of the board with every square not in vision.squares
+        replaced by "?".
+        """
+        board = [["?"] * self.width for _ in range(self.height)]
+        for x, y in vision.squares:
+            board[y][x] = self.board[y][x]
+        return board
+
+    def visible_ids(self, vision):
+        """
+        Returns the ids of everything on the squares in vision.squares.
+        """
+        ids = []
+        for x, y in vision.squares:
+            square = self.board[y][x]
+            if square != " " and square != "W":
+                ids.append(square)
+        return ids
+
+    def copy(self):
+        return Map(self.width, self.height, [list(row) for row in self.board], self.name)
+
     def to_dict(self):
         return {
             "width": self.width,
@@ -41,14 +77,26 @@ class Map:
         return Map(dic["width"], dic["height"], dic["board"], dic["name"])
 
 
+def read_map_data(file_path):
+    """
+    Read a map file.  Returns its contents as a dictionary with the keys
+    "name", "width", "height", "map", "trees", "gold_mines", and "robots".
+    A .wcmb file is read as a BinaryMapData, which looks the same but only
+    decodes the trees, gold mines, and robots when they are looked up.
+    """
+    if file_path.endswith(".wcmb"):
+        return read_binary_map(file_path)
+    with open(file_path) as f:
+        return json.load(f)
+
+
 def load_map(file_path):
     """
     Load a map from a file path.  Returns a tuple (map, trees, gold_mines, robots)
     of the map, starting trees, starting gold mines, and starting robots.
     """
-    data = json.load(file_path)
-
-    map = Map.from_dict(data["map"])
+    data = read_map_data(file_path)
+    map = Map(data["width"], data["height"], data["map"], data["name"])
     trees = {tree_info["id"]: Tree.from_dict(tree_info) for tree_info in data["trees"]}
     gold_mines = {gold_mine_info["id"]: GoldMine.from_dict(gold_mine_info) for gold_mine_info in data["gold_mines"]}
     robots = {robot_info["id"]: Robot.from_dict(robot_info) for robot_info in data["robots"]}
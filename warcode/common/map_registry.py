@@ -0,0 +1,99 @@
+import os
+import os.path
+
+from .gold_mine import GoldMine
+from .map import Map, read_map_data
+from .robot import Robot
+from .team import Team
+from .tree import Tree
+from .type import Type
+
+class MapTemplate:
+    """
+    A map file, parsed once and kept in a form that is never changed:  the
+    board as a tuple of row tuples and the trees, gold mines, and robots as
+    tuples of their fields.  Each call to instantiate makes a fresh copy for a
+    game to change, without adding the ids to the process-wide id set.
+    """
+    def __init__(self, name, width, height, board, trees, gold_mines, robots):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.board = board
+        self.trees = trees
+        self.gold_mines = gold_mines
+        self.robots = robots
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Make a template from a map file's contents, as read by read_map_data.
+        """
+        return cls(
+            data["name"],
+            data["width"],
+            data["height"],
+            tuple(tuple(row) for row in data["map"]),
+            tuple((tree["id"], tree["x"], tree["y"], tree["health"]) for tree in data["trees"]),
+            tuple((gold_mine["id"], gold_mine["x"], gold_mine["y"], gold_mine["health"])
+                  for gold_mine in data["gold_mines"]),
+            tuple((robot["id"], robot["x"], robot["y"], Type.from_string(robot["type"]),
+                   Team.from_string(robot["team"]), robot["health"])
+                  for robot in data["robots"]),
+        )
+
+    def instantiate(self):
+        """
+        Returns a new (map, trees, gold_mines, robots), as load_map does.
+        """
+        map = Map(self.width, self.height, [list(row) for row in self.board], self.name)
+        trees = {id: Tree(x, y, health, id) for id, x, y, health in self.trees}
+        gold_mines = {id: GoldMine(x, y, health, id) for id, x, y, health in self.gold_mines}
+        robots = {id: Robot(x, y, type, team, health, id)
+                  for id, x, y, type, team, health in self.robots}
+        return (map, trees, gold_mines, robots)
+
+
+class MapRegistry:
+    """
+    Parses each map file once and hands out copies of it.  A file that has
+    changed on disk since it was parsed is parsed again.
+
+    Templates loaded before a process forks, for example before a
+    multiprocessing pool is started, are shared with the children without
+    being parsed again.
+    """
+    def __init__(self):
+        # Path to (modification time, size, template).
+        self.templates = {}
+
+    def template(self, file_path):
+        """
+        Returns the MapTemplate of a map file.
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        entry = self.templates.get(file_path)
+        if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            entry = (stat.st_mtime_ns, stat.st_size,
+                     MapTemplate.from_data(read_map_data(file_path)))
+            self.templates[file_path] = entry
+        return entry[2]
+
+    def load(self, file_path):
+        """
+        Load a map from a file path.  Returns a tuple (map, trees, gold_mines,
+        robots), as load_map does.
+        """
+        return self.template(file_path).instantiate()
+
+    def preload(self, file_paths):
+        """
+        Parse every one of the map files now.
+        """
+        for file_path in file_paths:
+            self.template(file_path)
+
+
+# The registry Game loads its maps through.
+map_registry = MapRegistry()
@@ -2,17 +2,20 @@ import random
 
 from .team import Team
 from .type import Type
-from .id import add_id, random_id
+from .id import choose_id
 
 class Robot:
-    def __init__(self, x, y, type, team, health=None, id=None):
+    def __init__(self, x, y, type, team, health=None, id=None, ids=None):
+        """
+        id:  the robot's id.  If it is not given, a new one is drawn from ids,
+                an IdAllocator, which must then be given.
+        """
         self.x = x
         self.y = y
         self.team = team
         self.type = type
         self.health = health or self.type.starting_health
-        self.id = id or random_id()
-        add_id(self.id)
+        self.id = choose_id(id, ids)
 
     def to_dict(self):
         return {
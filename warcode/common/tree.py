@@ -1,13 +1,16 @@
 from .game_constants import GameConstants
-from .id import add_id, random_id
+from .id import choose_id
 
 class Tree:
-    def __init__(self, x, y, health=None, id=None):
+    def __init__(self, x, y, health=None, id=None, ids=None):
+        """
+        id:  the tree's id.  If it is not given, a new one is drawn from ids,
+                an IdAllocator, which must then be given.
+        """
         self.x = x
         self.y = y
         self.health = health if health is not None else GameConstants.TREE_STARTING_HEALTH
-        self.id = id or random_id()
-        add_id(self.id)
+        self.id = choose_id(id, ids)
 
 
     def to_dict(self):
@@ -0,0 +1,97 @@
+"""
+Action logs record just enough of a game to play it again without the
+players' code:  the map, the seed, and the actions every robot took each
+turn.  resimulate feeds the actions straight back into the
+engine and checks that it ends up in the same states.
+
+An action log is a gzip compressed stream of json lines.  The first line is
+the header:
+
+    {"type": "header", "version": 2, "map": <map name or path>, "seed": <seed>,
+     "checkpoint_interval": K}
+
+followed by a line per turn:
+
+    {"type": "turn", "turn": t, "actions": [[robot id, actions], ...],
+     "hash": <state hash>}
+
+"hash" is only there every K turns.  The last line is the result:
+
+    {"type": "result", "turn": t, "winner": "RED" or "BLUE", "hash": <state hash>}
+"""
+import gzip
+import json
+
+from ..common.errors import GameException
+
+# Version 2 added the seed and dropped the robots built each turn.
+VERSION = 2
+
+
+class ActionLogWriter:
+    """
+    Writes an action log as a game is played.
+    """
+    def __init__(self, path, map_name, seed, checkpoint_interval=50):
+        """
+        path:  file to write the log to
+        map_name:  the map the game is played on, as given to Game
+        seed:  the game's seed
+        checkpoint_interval:  number of turns between state hashes
+        """
+        self.checkpoint_interval = checkpoint_interval
+        self.file = gzip.open(path, "wt")
+        self.write_line({
+            "type": "header",
+            "version": VERSION,
+            "map": map_name,
+            "seed": seed,
+            "checkpoint_interval": checkpoint_interval,
+        })
+
+    def record_turn(self, game, actions):
+        """
+        Record the actions taken during the game's current turn.
+        """
+        record = {"type": "turn", "turn": game.turn, "actions": actions}
+        if game.turn % self.checkpoint_interval == 0:
+            record["hash"] = game.state_hash()
+        self.write_line(record)
+
+    def close(self, game):
+        """
+        Record the result of the game and close the file.
+        """
+        winner = game.winner or game.get_winner()
+        self.write_line({
+            "type": "result",
+            "turn": game.turn,
+            "winner": winner.to_string() if winner else None,
+            "hash": game.state_hash(),
+        })
+        self.file.close()
+
+    def write_line(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def read_action_log(path):
+    """
+    Read an action log.  Returns (header, list of turn records, result), where
+    result is None if the game did not finish.  Raises GameException for a log
+    written in another version of the format.
+    """
+    with gzip.open(path, "rt") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != VERSION:
+            raise GameException("Cannot read version {} action logs, only version {}".format(
+                header.get("version"), VERSION))
+        turns = []
+        result = None
+        for line in file:
+            record = json.loads(line)
+            if record["type"] == "result":
+                result = record
+            else:
+                turns.append(record)
+    return header, turns, result
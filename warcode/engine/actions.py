@@ -0,0 +1,73 @@
+"""
+Parsing of the actions players send.
+
+A player's line of actions is parsed into a tuple of actions, each of which is
+(text, handler, args):  the action as the player wrote it, the name of the
+Game method that carries it out (called as handler(player, *args)), and its
+arguments, already converted.  handler is None for an action that could not
+be parsed.
+
+Parsing only depends on the line, so parsed lines are cached, and a bot that
+sends the same line again costs a dictionary lookup.
+"""
+from functools import lru_cache
+
+from ..common import GameConstants, Type
+
+# First word of each action, to the Game method that handles it and the
+# functions that convert the words after it into the method's arguments.
+# Words after those are ignored.
+ACTIONS = {
+    "ATTACK": ("attack", (int, int)),
+    "BUILD": ("build", (int, int, Type.from_string)),
+    "CUT": ("cut", (int,)),
+    "EXPLODE": ("kill", ()),
+    "MINE": ("mine", (int,)),
+    "MOVE": ("move", (int, int)),
+    "TRAIN": ("train", (Type.from_string,)),
+    "WAIT": ("wait", ()),
+    "RESYNC": ("resync", ()),
+}
+
+
+def parse_action(text):
+    """
+    Parse a single action.  Returns (text, handler, args).
+    """
+    tokens = text.split()
+    spec = ACTIONS.get(tokens[0]) if tokens else None
+    if spec is None:
+        return (text, None, ())
+    handler, converters = spec
+    if len(tokens) <= len(converters):
+        return (text, None, ())
+    try:
+        return (text, handler, tuple(convert(token)
+                                     for convert, token in zip(converters, tokens[1:])))
+    except (KeyError, ValueError):
+        return (text, None, ())
+
+
+def parse_actions(line, limit=GameConstants.MAX_ACTIONS_PER_TURN):
+    """
+    Parse a semicolon separated line of actions.  Empty actions are skipped.
+    Returns (actions, ignored):  a tuple of the parsed actions among the first
+    limit, and whether anything came after those, which is ignored unparsed.
+    """
+    if len(line) <= _MAX_CACHED_LENGTH:
+        return _parse_cached(line, limit)
+    return _parse(line, limit)
+
+
+def _parse(line, limit):
+    texts = line.split(";", limit)
+    ignored = False
+    if len(texts) > limit:
+        ignored = bool(texts.pop().strip("; \t"))
+    return tuple(parse_action(text) for text in texts if text.strip()), ignored
+
+
+# Longer lines are not cached, so that a bot cannot fill the cache with huge
+# lines.
+_MAX_CACHED_LENGTH = 1000
+_parse_cached = lru_cache(maxsize=4096)(_parse)
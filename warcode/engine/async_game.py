@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os.path
+import psutil
+import traceback
+
+from ..common import Team
+from ..common.errors import InvalidLanguageError
+from .game import Game
+from .player import LINE_LIMIT
+
+class AsyncPlayer:
+    """
+    A Player whose code is talked to with asyncio subprocess streams, so that
+    many games can wait on their players in one event loop.
+    """
+    def __init__(self, path_to_code, language, robot, cooperative=False):
+        """
+        Prepare a player's code.  The process itself is started by the first
+        call to run_turn, since starting it has to be awaited.
+
+        path_to_code:  directory containing the player's main.py
+        language:  language the player is written in
+        robot:  the robot this player controls
+        cooperative:  if True, trust the player to block on stdin between
+                turns instead of suspending and resuming its process with
+                signals every turn.
+        """
+        if language != "python":
+            raise InvalidLanguageError("Sorry, but " + language + " is not supported.")
+
+        self.robot = robot
+        self.turns_taken = 0
+        self.command = ["python", os.path.join(path_to_code, "main.py")]
+        self.cooperative = cooperative
+        self.process = None
+        self.ps_process = None
+        self.stderr_task = None
+        self.killed = False
+
+    async def start(self, logger=None):
+        """
+        Start the player's process.
+        """
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT,
+        )
+        if not self.cooperative:
+            self.ps_process = psutil.Process(self.process.pid)
+            self.pause()
+        self.stderr_task = asyncio.ensure_future(self.log_stderr(logger))
+
+    async def run_turn(self, observation, time_limit=20, logger=None):
+        """
+        Runs the player's code for a turn, returning the actions the player takes.
+
+        observation:  What the robot can see this turn.  It is sent to the
+                player's stdin as a single line of json.
+        time_limit:  Time limit, in milliseconds, for player to output action.
+                If not printed in that time, the player is killed.
+        """
+        self.turns_taken += 1
+        line = None
+        try:
+            if self.process is None:
+                await self.start(logger)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + time_limit / 1000
+
+            self.process.stdin.write((json.dumps(observation) + "\n").encode())
+            await self.process.stdin.drain()
+            self.unpause()
+            try:
+                line = await asyncio.wait_for(self.process.stdout.readline(),
+                                              deadline - loop.time())
+            except asyncio.TimeoutError:
+                pass
+            self.pause()
+        except Exception:
+            if logger:
+                logger.error(self, traceback.format_exc())
+
+        # Kill the robot if the player doesn't return in time, throws an
+        # error, or closes its stdout.
+        if not line:
+            return "EXPLODE"
+        return line.decode().rstrip("\n")
+
+    async def log_stderr(self, logger=None):
+        """
+        Print out everything the player writes to stderr.
+        """
+        async for line in self.process.stderr:
+            if logger:
+                logger.logline(self, line.decode(errors="replace").rstrip("\n") + "\n")
+
+    def pause(self):
+        """
+        Pause the execution of the player's code.
+        """
+        if self.ps_process:
+            self.ps_process.suspend()
+
+    def unpause(self):
+        """
+        Resume the execution of the player's code.
+        """
+        if self.ps_process:
+            self.ps_process.resume()
+
+    def kill_process(self):
+        """
+        Kill our process
+        """
+        self.killed = True
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+
+    async def wait(self):
+        """
+        Wait for a killed process to exit.
+        """
+        if self.process is not None:
+            await self.process.wait()
+        if self.stderr_task is not None:
+            await self.stderr_task
+
+
+class AsyncGame(Game):
+    """
+    A Game whose players are waited on with asyncio, so that many games can
+    share one thread.  The rules and the order robots take their turns in are
+    the same as in Game; only run, run_turn, and close are coroutines.
+    """
+    # Options of Game that need players AsyncPlayer cannot stand in for.
+    UNSUPPORTED = ("multiplex", "zygote", "protocols", "sandbox", "profile")
+
+    def __init__(self, map_name, player1_dir, player2_dir,
+                 language1="python", language2="python", debug=False, cooperative=False,
+                 array_map=False, replay=None, action_log=None, seed=None, log_jsonl=None,
+                 **options):
+        """
+        Initialize the game.  See Game for the arguments.  The options in
+        UNSUPPORTED raise a ValueError if they are turned on.
+        """
+        for name in sorted(options):
+            if name not in self.UNSUPPORTED:
+                raise TypeError("AsyncGame got an unexpected keyword argument " + repr(name))
+            if options[name]:
+                raise ValueError("AsyncGame does not support the {} option".format(name))
+        self.killed_players = []
+        super().__init__(map_name, player1_dir, player2_dir, language1, language2,
+                         debug, cooperative, array_map=array_map, replay=replay,
+                         action_log=action_log, seed=seed, log_jsonl=log_jsonl)
+
+    async def run(self):
+        """
+        Run the game.
+        """
+        self.going = True
+        self.turn = 1
+
+        try:
+            await asyncio.gather(*(player.start(self.logger) for player in self.players.values()))
+            await self.run_turn()
+            while self.going:
+                self.turn += 1
+                await self.run_turn()
+        finally:
+            await self.close()
+
+        self.winner = self.get_winner()
+        return self.winner
+
+    async def close(self):
+        """
+        Kill every process still running and wait for them to exit.
+        """
+        for player in self.players.values():
+            player.kill_process()
+        await asyncio.gather(*(player.wait() for player in self.killed_players),
+                             *(player.wait() for player in self.players.values()))
+        self.killed_players = []
+        super().close()
+
+    def create_player(self, robot):
+        """
+        Creates a player from a robot.
+        """
+        return (
+            AsyncPlayer(self.player1_dir, self.language1, robot, self.cooperative)
+            if robot.team is Team.RED else
+            AsyncPlayer(self.player2_dir, self.language2, robot, self.cooperative)
+        )
+
+    async def run_turn(self):
+        """
+        Run a single turn in the game.
+        """
+        for player in list(self.players.values()):
+            if player.robot.health <= 0:
+                continue
+            actions = await player.run_turn(self.get_observation(player.robot),
+                                           time_limit=self.get_time_limit(player),
+                                           logger=self.logger)
+            self.process_actions(actions, player)
+        self.end_turn()
+
+    def kill(self, player):
+        """
+        Kills a player's robot, remembering the player so that close can wait
+        for its process to exit.
+        """
+        super().kill(player)
+        self.killed_players.append(player)
+
+
+async def run_games(games):
+    """
+    Run several AsyncGames at once.  Returns their winners.
+    """
+    return await asyncio.gather(*(game.run() for game in games))
+
+
+def play_games(games):
+    """
+    Run several AsyncGames at once in a new event loop.  Returns their winners.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run_games(games))
+    finally:
+        loop.close()
@@ -1,46 +1,131 @@
+import hashlib
+import os.path
 import sys
 import random
-from collections import deque
-
-from ..common import Map, Team, load_map, GameConstants, Robot
-from .player import Player
-from .logger import Logger
+import time
+
+from ..common import (ArrayMap, GoldMine, Map, Team, Tree, Type, GameConstants, Robot,
+                      map_registry)
+from ..common.id import IdAllocator
+from .action_log import ActionLogWriter
+from .actions import parse_action, parse_actions
+from .player import BotProcess, InProcessPlayer, Player, MultiplexedPlayer
+from .profiler import Profiler
+from .protocol import SharedMemoryProtocol, SharedSegment
+from .registry import EntityRegistry
+from .replay import ReplayWriter
+from .vision import VisionCache
+from .logger import DEBUG, Logger
+from .stats import Stats
+from .zygote import Zygote
+
+_my_dir = os.path.dirname(os.path.realpath(__file__))
+_map_dir = os.path.abspath(os.path.join(_my_dir, os.pardir, os.pardir, "resources", "maps"))
 
 
 class Game:
     def __init__(self, map_name, player1_dir, player2_dir,
-                 language1="python", language2="python", debug=False):
+                 language1="python", language2="python", debug=False, cooperative=False,
+                 multiplex=False, zygote=False, array_map=False, protocols=None, replay=None,
+                 action_log=None, seed=None, sandbox=None, profile=False, log_jsonl=None):
         """
         Initialize the game.
-        map_name:  name of the map to play on
+        map_name:  name of the map to play on, or a path to a map file
         player1_dir:  path to the directory containing the first player's code
         player2_dir:  path to the directory containing the second player's code
-        language1:  the language player1 is written in
+        language1:  the language player1 is written in.  "python-inprocess"
+                runs trusted python code inside this process (see
+                InProcessPlayer).
         language2:  the language player2 is written in
         debug:  print out debug outputs
-        """
-        self.map, self.trees, self.gold_mines, robots = load_map(map_name)
+        log_jsonl:  if given, a path to also write the debug outputs to as
+                json lines (see Logger)
+        cooperative:  trust the players to block on stdin between turns rather
+                than suspending their processes with signals
+        multiplex:  run all of a team's robots in one long-lived process
+                instead of starting a process per robot
+        zygote:  fork each robot's process from a zygote that has already
+                imported the player's code, instead of starting a new
+                interpreter for it
+        array_map:  store the map in numpy arrays (see ArrayMap)
+        protocols:  names of the protocols (see protocol.py) players may pick
+                from, e.g. ("json", "delta").  By default every player gets
+                json and is not asked.  Offering "shm" gives each team a
+                SharedSegment that its players' observations are written to.
+        replay:  if given, a path to write a replay of the game to (see
+                replay.py)
+        action_log:  if given, a path to write a log of the actions taken to,
+                which can be played again without the players (see
+                action_log.py and resimulate.py)
+        seed:  seed for everything random in the game, such as the ids of the
+                robots built.  Games with the same seed, map, and actions play
+                out the same.  A random seed is picked if none is given.
+        sandbox:  if given, a Sandbox (see warcode.sandbox) to run the
+                players' code in.  Time limits are then judged on the CPU
+                time the code uses.
+        profile:  if True, time every phase of every robot's turn into
+                self.profiler (see profiler.py).  If a path, also write the
+                timings there when the game ends, as csv if the path ends in
+                .csv and as json otherwise.
+        """
+        self.map, trees, gold_mines, robots = map_registry.load(find_map(map_name))
+        if array_map:
+            self.map = ArrayMap.from_map(self.map, trees, gold_mines)
+        self.registry = EntityRegistry(trees.values(), gold_mines.values(), robots.values())
+        self.trees = self.registry.trees
+        self.gold_mines = self.registry.gold_mines
+        self.vision = VisionCache(self.map)
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.ids = IdAllocator(self.seed)
+        for id in self.registry.trees.keys() | self.gold_mines.keys() | self.registry.robots.keys():
+            self.ids.add_id(id)
         self.player1_dir = player1_dir
         self.player2_dir = player2_dir
         self.language1 = language1
         self.language2 = language2
+        self.cooperative = cooperative
+        self.multiplex = multiplex
+        self.protocols = protocols
+        self.sandbox = sandbox
+        self.team_processes = {}
+        self.segments = {}
+        self.zygotes = {}
+        if zygote and not multiplex:
+            for path, language in ((player1_dir, language1), (player2_dir, language2)):
+                if language != InProcessPlayer.language and (path, language) not in self.zygotes:
+                    self.zygotes[(path, language)] = Zygote(path, language, sandbox)
+
+        self.stats = Stats()
+        self.profiler = Profiler() if profile else None
+        self.profile_path = profile if isinstance(profile, str) else None
+        self.logger = None
+        if debug or log_jsonl:
+            self.logger = Logger(sys.stdout if debug else None, jsonl=log_jsonl,
+                                 flush_interval=0.1)
 
         self.players = {
             robot.id: self.create_player(robot)
-            for robot in robots
+            for robot in robots.values()
         }
 
-        self.queue = deque(self.players)
-
         self.gold = {"RED": GameConstants.STARTING_GOLD, "BLUE": GameConstants.STARTING_GOLD}
         self.wood = {"RED": GameConstants.STARTING_WOOD, "BLUE": GameConstants.STARTING_WOOD}
 
-        self.logger = Logger(sys.stdout) if debug else None
-
         self.going = False
         self.turn = 0
         self.winner = None
 
+        # Actions taken this turn, as [robot id, actions], for the replay and
+        # the action log.
+        self.turn_actions = []
+        self.action_log = None
+        if action_log:
+            self.action_log = ActionLogWriter(action_log, map_name, self.seed)
+        self.replay = None
+        if replay:
+            self.replay = ReplayWriter(replay, self.map, [player1_dir, player2_dir])
+            self.record_turn()
+
     def run(self):
         """
         Run the game.
@@ -48,97 +133,336 @@ class Game:
         self.going = True
         self.turn = 1
 
-        self.run_turn()
-        while self.going:
-            self.turn += 1
+        try:
             self.run_turn()
+            while self.going:
+                self.turn += 1
+                self.run_turn()
+        finally:
+            self.close()
 
         self.winner = self.get_winner()
         return self.winner
 
+    def close(self):
+        """
+        Kill every process still running.
+        """
+        for player in self.players.values():
+            player.kill_process()
+        for process in self.team_processes.values():
+            process.kill()
+        self.team_processes = {}
+        for zygote in self.zygotes.values():
+            zygote.kill()
+        self.zygotes = {}
+        for segment in self.segments.values():
+            segment.close()
+        self.segments = {}
+        if self.replay:
+            self.replay.close()
+            self.replay = None
+        if self.action_log:
+            self.action_log.close(self)
+            self.action_log = None
+        if self.profile_path:
+            self.profiler.save(self.profile_path)
+            self.profile_path = None
+        if self.logger:
+            self.logger.close()
+
     def create_player(self, robot):
         """
-        Creates a player from a robot.
+        Creates a player from a robot.  The time it takes, in milliseconds, is
+        recorded in self.stats as "spawn".
         """
-        return (
-            Player(self.player1_dir, self.language1, robot)
+        start_time = time.perf_counter()
+        path, language = (
+            (self.player1_dir, self.language1)
             if robot.team is Team.RED else
-            Player(self.player2_dir, self.language2, robot)
+            (self.player2_dir, self.language2)
         )
+        if language == InProcessPlayer.language:
+            player = InProcessPlayer(path, robot)
+        elif self.multiplex:
+            player = MultiplexedPlayer(self.get_team_process(robot.team), robot, self.protocols,
+                                       self.get_segment(robot.team))
+        else:
+            player = Player(path, language, robot, self.cooperative,
+                            self.zygotes.get((path, language)), self.protocols,
+                            self.get_segment(robot.team), self.sandbox)
+        player.profiler = self.profiler
+        self.stats.record("spawn", (time.perf_counter() - start_time) * 1000)
+        if self.profiler:
+            self.profiler.record_since(robot.id, "spawn", start_time)
+        return player
+
+    def get_segment(self, team):
+        """
+        Returns the SharedSegment for a team's observations, or None if the
+        shm protocol is not offered.
+        """
+        if not self.protocols or SharedMemoryProtocol.name not in self.protocols:
+            return None
+        if team not in self.segments:
+            self.segments[team] = SharedSegment()
+        return self.segments[team]
+
+    def get_team_process(self, team):
+        """
+        Returns the process shared by all of a team's robots, starting it if
+        necessary.
+        """
+        if team not in self.team_processes:
+            self.team_processes[team] = (
+                BotProcess(self.player1_dir, self.language1, self.cooperative, ["--multiplex"],
+                           sandbox=self.sandbox)
+                if team is Team.RED else
+                BotProcess(self.player2_dir, self.language2, self.cooperative, ["--multiplex"],
+                           sandbox=self.sandbox)
+            )
+        return self.team_processes[team]
 
     def run_turn(self):
         """
         Run a single turn in the game.
         """
-        for player in self.players[:]:
+        if self.profiler:
+            self.profiler.turn = self.turn
+        if self.logger:
+            self.logger.turn = self.turn
+        for player in list(self.players.values()):
             if player.robot.health <= 0:
                 continue
-            # Player gets x5 time on the first turn.
-            time_multiplier = 5 if player.turns_taken == 0 else 1
-            actions = player.run_turn(self.get_input(player.robot),
-                                     time_limit=player.robot.type.time_limit * time_multiplier,
-                                     debug=self.debug)
-            for action in actions.split(";"):
-                self.process_action(action, player.robot)
+            if self.profiler:
+                self.run_profiled_turn(player)
+                continue
+            actions = player.run_turn(self.get_observation(player.robot),
+                                     time_limit=self.get_time_limit(player),
+                                     logger=self.logger)
+            self.process_actions(actions, player)
+        self.end_turn()
+
+    def run_profiled_turn(self, player):
+        """
+        Run a player's turn, recording how long each phase takes in
+        self.profiler.
+        """
+        id = player.robot.id
+        start_time = time.perf_counter()
+        observation = self.get_observation(player.robot)
+        start_time = self.profiler.record_since(id, "observation", start_time)
+        actions = player.run_turn(observation, time_limit=self.get_time_limit(player),
+                                  logger=self.logger)
+        start_time = self.profiler.record_since(id, "turn", start_time)
+        self.process_actions(actions, player)
+        self.profiler.record_since(id, "actions", start_time)
+
+    def get_time_limit(self, player):
+        """
+        Returns how many milliseconds a player has to take its turn.
+        """
+        # Player gets x5 time on the first turn.
+        time_multiplier = 5 if player.turns_taken == 0 else 1
+        return player.robot.type.time_limit * time_multiplier
+
+    def process_actions(self, actions, player):
+        """
+        Process a semicolon separated list of actions taken by a player.  Only
+        the first GameConstants.MAX_ACTIONS_PER_TURN are looked at.
+        """
+        self.turn_actions.append([player.robot.id, actions])
+        parsed, ignored = parse_actions(actions, GameConstants.MAX_ACTIONS_PER_TURN)
+        # The same as calling apply_action on each action, without the call.
+        log_actions = self.logger and self.logger.level <= DEBUG
+        for text, handler, args in parsed:
+            if player.robot.health <= 0:
+                break
+            if log_actions:
+                self.logger.log_action(player, text)
+            if handler is not None:
+                getattr(self, handler)(player, *args)
+            elif self.logger:
+                self.logger.warning(player, "Invalid action: {}", text, event="invalid_action")
+        if ignored and self.logger:
+            self.logger.warning(player, "Ignoring the actions after the first {}",
+                                GameConstants.MAX_ACTIONS_PER_TURN, event="too_many_actions")
+
+    def end_turn(self):
+        """
+        Clean up after every player has taken its turn.
+        """
         self.remove_dead_players()
         self.check_over()
+        if self.replay:
+            self.record_turn()
+        if self.action_log:
+            self.action_log.record_turn(self, self.turn_actions)
+        self.turn_actions = []
+
+    def record_turn(self):
+        """
+        Hand the state at the end of the turn to the replay writer.
+        """
+        self.replay.record(self.turn, self.turn_actions, self.map.copy(),
+                           self.registry.robots.values(), self.trees.values(),
+                           self.gold_mines.values(), self.gold, self.wood)
+
+    def state_hash(self):
+        """
+        Returns a hash of everything that affects how the rest of the game is
+        played:  the turn, the board, every entity, and both teams' resources.
+        """
+        state = (
+            self.turn,
+            self.map.to_dict()["board"],
+            sorted((robot.id, robot.x, robot.y, robot.type.to_string(), robot.team.to_string(),
+                    robot.health) for robot in self.registry.robots.values()),
+            sorted((tree.id, tree.x, tree.y, tree.health) for tree in self.trees.values()),
+            sorted((gold_mine.id, gold_mine.x, gold_mine.y, gold_mine.health)
+                   for gold_mine in self.gold_mines.values()),
+            sorted(self.gold.items()),
+            sorted(self.wood.items()),
+        )
+        return hashlib.sha1(repr(state).encode()).hexdigest()
+
+    def snapshot(self):
+        """
+        Returns a Snapshot of the game between two turns, which restore can
+        bring the game back to.
+        """
+        return Snapshot(
+            turn=self.turn,
+            going=self.going,
+            map=self.map.copy(),
+            robots=tuple((robot.id, robot.x, robot.y, robot.type, robot.team, robot.health)
+                         for robot in (player.robot for player in self.players.values())
+                         if robot.health > 0),
+            trees=tuple((tree.id, tree.x, tree.y, tree.health) for tree in self.trees.values()),
+            gold_mines=tuple((gold_mine.id, gold_mine.x, gold_mine.y, gold_mine.health)
+                             for gold_mine in self.gold_mines.values()),
+            gold=tuple(self.gold.items()),
+            wood=tuple(self.wood.items()),
+            turns_taken=tuple((id, player.turns_taken) for id, player in self.players.items()
+                              if player.robot.health > 0),
+            ids=self.ids.getstate(),
+        )
+
+    def restore(self, snapshot):
+        """
+        Bring the game back to a Snapshot.  Robots that are still alive keep
+        their players, robots that have died since get new ones, and the
+        players of robots built since are killed.
+        """
+        self.turn = snapshot.turn
+        self.going = snapshot.going
+        self.map = snapshot.map.copy()
+        robots = [Robot(x, y, type, team, health, id)
+                  for id, x, y, type, team, health in snapshot.robots]
+        self.registry = EntityRegistry(
+            [Tree(x, y, health, id) for id, x, y, health in snapshot.trees],
+            [GoldMine(x, y, health, id) for id, x, y, health in snapshot.gold_mines],
+            robots,
+        )
+        self.trees = self.registry.trees
+        self.gold_mines = self.registry.gold_mines
+        self.vision = VisionCache(self.map)
+        self.gold = dict(snapshot.gold)
+        self.wood = dict(snapshot.wood)
+        self.ids.setstate(snapshot.ids)
+        self.turn_actions = []
+
+        players = {}
+        for robot in robots:
+            player = self.players.pop(robot.id, None)
+            if player is not None and player.robot.health > 0:
+                player.robot = robot
+                player.resync()
+            else:
+                player = self.create_player(robot)
+            players[robot.id] = player
+        for id, turns_taken in snapshot.turns_taken:
+            players[id].turns_taken = turns_taken
+        for player in self.players.values():
+            player.kill_process()
+        self.players = players
+
+    def get_observation(self, robot):
+        """
+        Returns what a robot can see:  the map with every tile outside of its
+        vision radius replaced by "?", and the trees, gold mines, and robots
+        inside of its vision radius.
+        """
+        vision = self.vision.get(robot)
+        trees = []
+        gold_mines = []
+        robots = []
+        for id in self.map.visible_ids(vision):
+            if id in self.registry.robots:
+                robots.append(self.registry.robots[id].to_dict())
+            elif id in self.trees:
+                trees.append(self.trees[id].to_dict())
+            elif id in self.gold_mines:
+                gold_mines.append(self.gold_mines[id].to_dict())
+        return {
+            "id": robot.id,
+            "map": self.map.visible_board(vision),
+            "trees": trees,
+            "gold_mines": gold_mines,
+            "robots": robots,
+        }
 
     def process_action(self, action, player):
         """
-        Process an action taken by a player.
+        Process a single action taken by a player.
         """
+        if action.strip():
+            self.apply_action(parse_action(action), player)
 
-        if self.logger:
-            self.logger.log_action(action)
-
-        tokens = action.strip().split()
-        if len(tokens) == 0:
-            return # Empty action.  Ignore.
-        try:
-            if tokens[0] == "ATTACK":
-                x, y = int(tokens[1]), int(tokens[2])
-                self.attack(player, x, y)
-                return
-            if tokens[0] == "BUILD":
-                x, y = int(tokens[1]), int(tokens[2])
-                type = Type.from_string(tokens[3])
-                self.build(player, x, y, type)
-                return
-            if tokens[0] == "CUT":
-                tree_id = int(tokens[1])
-                self.cut(player, tree_id)
-                return
-            if tokens[0] == "EXPLODE":
-                self.kill(player)
-                return
-            if tokens[0] == "MINE":
-                gold_mine_id = int(tokens[1])
-                self.mine(player, gold_mine_id)
-                return
-            if tokens[0] == "MOVE":
-                x, y = int(tokens[1]), int(tokens[2])
-                self.move(player, x, y)
-                return
-            if tokens[0] == "TRAIN":
-                type = Type.from_string(tokens[1])
-                self.train(player, type)
-                return
-            if tokens[0] == "WAIT":
-                return
-        finally:
+    def apply_action(self, action, player):
+        """
+        Carry out an action parsed by parse_action (see actions.py).
+        """
+        text, handler, args = action
+        if self.logger and self.logger.level <= DEBUG:
+            self.logger.log_action(player, text)
+        if handler is None:
             if self.logger:
-                self.logger.log("Invalid action: " + action)
+                self.logger.warning(player, "Invalid action: {}", text, event="invalid_action")
+            return
+        getattr(self, handler)(player, *args)
+
+    def wait(self, player):
+        """
+        Have the player do nothing.
+        """
+        pass
+
+    def resync(self, player):
+        """
+        Send the player its whole observation next turn.
+        """
+        player.resync()
 
     def remove_dead_players(self):
-        self.players = [player for player in self.players if player.robot.health > 0]
+        self.players = {
+            id: player for id, player in self.players.items() if player.robot.health > 0
+        }
 
     def kill(self, player):
         """
         Kills a player's robot, but does not remove it from our list of players
         """
-        player.robot.health = 0
+        self.registry.set_health(player.robot, 0)
+        self.registry.remove(player.robot)
+        self.vision.forget(player.robot)
         self.map.board[player.robot.y][player.robot.x] = " "
-        player.kill_process()
+        if self.profiler:
+            start_time = time.perf_counter()
+            player.kill_process()
+            self.profiler.record_since(player.robot.id, "kill", start_time)
+        else:
+            player.kill_process()
 
     def kill_tree(self, tree):
         """
@@ -146,7 +470,7 @@ class Game:
         """
         tree.health = 0
         self.map.board[tree.y][tree.x] = " "
-        self.trees.remove(tree)
+        self.registry.remove(tree)
 
     def kill_gold_mine(self, gold_mine):
         """
@@ -154,33 +478,46 @@ class Game:
         """
         gold_mine.health = 0
         self.map.board[gold_mine.y][gold_mine.x] = "W"
-        self.gold_mines.remove(gold_mine)
+        self.registry.remove(gold_mine)
 
     def attack(self, player, x, y):
         """
         Have the player attack the position (x, y).
         """
+        if not player.robot.type.is_unit():
+            if self.logger:
+                self.logger.warning(player, "Cannot ATTACK: Only units can attack.",
+                                    event="illegal_action")
+            return
+
         if not self.map.is_on_the_map(x, y):
             if self.logger:
-                self.logger.log(player, "Cannot ATTACK: ({}, {}) is off the map.".format(x, y))
+                self.logger.warning(player, "Cannot ATTACK: ({}, {}) is off the map.", x, y,
+                                    event="illegal_action")
             return
 
         if player.robot.type.attack_radius < (x - player.robot.x) ** 2 + (y - player.robot.y) ** 2:
             if self.logger:
-                self.logger.log(
-                    player, "Cannot ATTACK: ({}, {}) is too far from current location.".format(x, y))
+                self.logger.warning(player,
+                                    "Cannot ATTACK: ({}, {}) is too far from current location.",
+                                    x, y, event="illegal_action")
             return
 
-        for player2 in self.players[:]:
-            if (player2.robot.x - x) ** 2 + (player2.robot.y - y) ** 2 <= player.robot.damage_radius:
-                player2.robot.health -= player.robot.attack_damage
+        # The board holds the id of whatever is on each square, so only the
+        # squares inside the damage radius need to be looked at.
+        attack_damage = player.robot.type.attack_damage
+        squares = list(self.map.squares_in_disc(x, y, player.robot.type.damage_radius))
+        for _, _, square in squares:
+            if square in self.players:
+                player2 = self.players[square]
+                self.registry.set_health(player2.robot, player2.robot.health - attack_damage)
                 if player2.robot.health <= 0:
                     self.kill(player2)
 
-        # Trees get harmed by attacks, but gold mines do not.
-        for tree_id in self.:
-            if (tree.x - x) ** 2 + (tree.y - y) ** 2 <= player.robot.damage_radius:
-                tree.health -= player.robot.attack_damage
+            # Trees get harmed by attacks, but gold mines do not.
+            elif square in self.trees:
+                tree = self.trees[square]
+                tree.health -= attack_damage
                 if tree.health <= 0:
                     self.kill_tree(tree)
 
@@ -190,43 +527,64 @@ class Game:
         """
         if (player.robot.type, type) not in GameConstants.LEGAL_BUILDS:
             if self.logger:
-                self.logger.log(player, "Cannot BUILD: A {} cannot build a {}.".format(
-                    player.robot.type, type))
+                self.logger.warning(player,
+                                    "Cannot BUILD: A {} cannot build a {}.",
+                                    player.robot.type.to_string(), type.to_string(),
+                                    event="illegal_action")
             return
 
         if not self.map.is_on_the_map(x, y):
             if self.logger:
-                self.logger.log(player, "Cannot BUILD: ({}, {}) is off the map.".format(x, y))
+                self.logger.warning(player, "Cannot BUILD: ({}, {}) is off the map.", x, y,
+                                    event="illegal_action")
             return
 
         if (x - player.robot.x) ** 2 + (y - player.robot.y) ** 2 > 2:
             if self.logger:
-                self.logger.log(
-                    player, "Cannot BUILD: ({}, {}) is not adjacent to the robot.".format(x, y))
+                self.logger.warning(player,
+                                    "Cannot BUILD: ({}, {}) is not adjacent to the robot.", x, y,
+                                    event="illegal_action")
             return
 
         if self.map.board[y][x] != " ":
             if self.logger:
-                self.logger.log(player, "Cannot BUILD: ({}, {}) is not empty.".format(x, y))
+                self.logger.warning(player, "Cannot BUILD: ({}, {}) is not empty.", x, y,
+                                    event="illegal_action")
             return
 
         if self.get_gold(player.robot.team) < type.gold_cost:
             if self.logger:
-                self.logger.log(player, "Cannot BUILD:  Insufficient gold.")
+                self.logger.warning(player, "Cannot BUILD:  Insufficient gold.",
+                                    event="illegal_action")
             return
 
         if self.get_wood(player.robot.team) < type.wood_cost:
             if self.logger:
-                self.logger.log(player, "Cannot BUILD:  Insufficient wood.")
+                self.logger.warning(player, "Cannot BUILD:  Insufficient wood.",
+                                    event="illegal_action")
             return
 
         self.add_gold(player.robot.team, -type.gold_cost)
         self.add_wood(player.robot.team, -type.wood_cost)
 
-        new_robot = Robot(x, y, player.robot.team, type)
-        new_player = self.create_player(new_robot)
-        self.map.board[new_player.robot.y][new_player.robot.x] = new_player.robot.id
-        self.players.append(new_player)
+        self.add_robot(Robot(x, y, type, player.robot.team, id=self.next_robot_id()))
+
+    def next_robot_id(self):
+        """
+        Returns the id for the next robot built.
+        """
+        return self.ids.random_id()
+
+    def add_robot(self, robot):
+        """
+        Put a new robot on the board and create its player.  Returns the player.
+        """
+        player = self.create_player(robot)
+        self.map.board[robot.y][robot.x] = robot.id
+        self.ids.add_id(robot.id)
+        self.registry.add(robot)
+        self.players[robot.id] = player
+        return player
 
     def cut(self, player, tree_id):
         """
@@ -234,24 +592,21 @@ class Game:
         """
         if player.robot.type is not Type.PEASANT:
             if self.logger:
-                self.logger.log(player, "Cannot CUT:  Robot is not a PEASANT.")
+                self.logger.warning(player, "Cannot CUT:  Robot is not a PEASANT.",
+                                    event="illegal_action")
             return
 
-        tree = None
-        for tree2 in self.trees:
-            if tree2.id == tree_id:
-                tree = tree2
-                break
-
+        tree = self.trees.get(tree_id)
         if tree is None:
             if self.logger:
-                self.logger.log(
-                    player, "Cannot CUT:  No tree with id {} does exists.".format(tree_id))
+                self.logger.warning(player, "Cannot CUT:  No tree with id {} does exists.", tree_id,
+                                    event="illegal_action")
             return
 
         if (player.robot.x - tree.x) ** 2 + (player.robot.y - tree.y) ** 2 > 2:
             if self.logger:
-                self.logger.log(player, "Cannot CUT:  Robot is not adjacent to tree.")
+                self.logger.warning(player, "Cannot CUT:  Robot is not adjacent to tree.",
+                                    event="illegal_action")
             return
 
         # Always get CUT_AMOUNT of wood, even if the tree is almost dead.
@@ -266,24 +621,22 @@ class Game:
         """
         if player.robot.type is not Type.PEASANT:
             if self.logger:
-                self.logger.log(player, "Cannot BUILD:  Robot is not a PEASANT.")
+                self.logger.warning(player, "Cannot MINE:  Robot is not a PEASANT.",
+                                    event="illegal_action")
             return
 
-        gold_mine = None
-        for gold_mine2 in self.trees:
-            if gold_mine2.id == gold_mine_id:
-                gold_mine = gold_mine2
-                break
-
+        gold_mine = self.gold_mines.get(gold_mine_id)
         if gold_mine is None:
             if self.logger:
-                self.logger.log(
-                    player, "Cannot MINE:  No gold mine with id {} does exists.".format(gold_mine_id))
+                self.logger.warning(player,
+                                    "Cannot MINE:  No gold mine with id {} does exists.",
+                                    gold_mine_id, event="illegal_action")
             return
 
         if (player.robot.x - gold_mine.x) ** 2 + (player.robot.y - gold_mine.y) ** 2 > 2:
             if self.logger:
-                self.logger.log(player, "Cannot MINE:  Robot is not adjacent to mine.")
+                self.logger.warning(player, "Cannot MINE:  Robot is not adjacent to mine.",
+                                    event="illegal_action")
             return
 
         # Always get MINE_AMOUNT of gold, even if the gold mine is almost deplenished.
@@ -298,28 +651,33 @@ class Game:
         """
         if not player.robot.type.is_unit():
             if self.logger:
-                self.logger.log(player, "Cannot MOVE: Only units can move.")
+                self.logger.warning(player, "Cannot MOVE: Only units can move.",
+                                    event="illegal_action")
             return
 
         if not self.map.is_on_the_map(x, y):
             if self.logger:
-                self.logger.log(player, "Cannot MOVE: ({}, {}) is off the map.".format(x, y))
+                self.logger.warning(player, "Cannot MOVE: ({}, {}) is off the map.", x, y,
+                                    event="illegal_action")
             return
 
         if player.robot.type.move_radius < (x - player.robot.x) ** 2 + (y - player.robot.y) ** 2:
             if self.logger:
-                self.logger.log(
-                    player, "Cannot MOVE: ({}, {}) is too far from current location.".format(x, y))
+                self.logger.warning(player,
+                                    "Cannot MOVE: ({}, {}) is too far from current location.", x, y,
+                                    event="illegal_action")
             return
 
-        if self.board[y][x] != " ":
+        if self.map.board[y][x] != " ":
             if self.logger:
-                self.logger.log(
-                    player, "Cannot MOVE: ({}, {}) is a wall or is occupied.".format(x, y))
+                self.logger.warning(player, "Cannot MOVE: ({}, {}) is a wall or is occupied.", x, y,
+                                    event="illegal_action")
             return
 
         self.map.board[player.robot.y][player.robot.x] = " "
         self.map.board[y][x] = player.robot.id
+        player.robot.x = x
+        player.robot.y = y
 
     def train(self, player, type):
         """
@@ -327,25 +685,29 @@ class Game:
         """
         if (player.robot.type, type) not in GameConstants.LEGAL_TRAINS:
             if self.logger:
-                self.logger.log(player, "Cannot TRAIN: A {} cannot train to become a {}.".format(
-                    player.robot.type, type))
+                self.logger.warning(player,
+                                    "Cannot TRAIN: A {} cannot train to become a {}.",
+                                    player.robot.type.to_string(), type.to_string(),
+                                    event="illegal_action")
             return
 
         if self.get_gold(player.robot.team) < type.gold_cost:
             if self.logger:
-                self.logger.log(player, "Cannot TRAIN: Insufficient gold.")
+                self.logger.warning(player, "Cannot TRAIN: Insufficient gold.",
+                                    event="illegal_action")
             return
 
         if self.get_wood(player.robot.team) < type.wood_cost:
             if self.logger:
-                self.logger.log(player, "Cannot TRAIN: Insufficient wood.")
+                self.logger.warning(player, "Cannot TRAIN: Insufficient wood.",
+                                    event="illegal_action")
             return
 
         self.add_gold(player.robot.team, -type.gold_cost)
         self.add_wood(player.robot.team, -type.wood_cost)
 
-        player.robot.type = type
-        player.robot.health = type.starting_health
+        self.registry.set_type(player.robot, type)
+        self.registry.set_health(player.robot, type.starting_health)
 
     def check_over(self):
         """
@@ -356,11 +718,11 @@ class Game:
             self.going = False
             return
 
-        if all(player.robot.team is Team.RED for player in self.players):
+        if self.registry.count(Team.BLUE) == 0:
             self.going = False
             return
 
-        if all(player.robot.team is Team.BLUE for player in self.players):
+        if self.registry.count(Team.RED) == 0:
             self.going = False
             return
 
@@ -376,11 +738,8 @@ class Game:
         if self.going:
             return None
 
-        red_players = [player for player in players if player.robot.team is Team.RED]
-        blue_players = [player for player in players if player.robot.team is Team.BLUE]
-
-        red_score = sum(player.robot.health for player in red_players)
-        blue_score = sum(player.robot.health for player in blue_players)
+        red_score = self.registry.team_health[Team.RED]
+        blue_score = self.registry.team_health[Team.BLUE]
 
         if red_score > blue_score:
             return Team.RED
@@ -396,8 +755,8 @@ class Game:
         if self.wood["BLUE"] > self.wood["RED"]:
             return Team.BLUE
 
-        highest_red_id = max(player.robot.id for player in red_team)
-        highest_blue_id = max(player.robot.id for player in blue_team)
+        highest_red_id = max(self.registry.robots_by_team[Team.RED], default=0)
+        highest_blue_id = max(self.registry.robots_by_team[Team.BLUE], default=0)
 
         if highest_red_id > highest_blue_id:
             return Team.RED
@@ -420,3 +779,40 @@ class Game:
             self.wood["RED"] += amount
         else:
             self.wood["BLUE"] += amount
+
+
+class Snapshot:
+    """
+    The state of a Game between two turns:  the turn, a copy of the map, the
+    trees, gold mines, and living robots as tuples, both teams' resources, how
+    many turns each living robot's player has taken, and the state of the
+    game's IdAllocator.  Nothing in it is shared with the game, so it can be
+    restored any number of times.
+    """
+    def __init__(self, turn, going, map, robots, trees, gold_mines, gold, wood, turns_taken,
+                 ids):
+        self.turn = turn
+        self.going = going
+        self.map = map
+        self.robots = robots
+        self.trees = trees
+        self.gold_mines = gold_mines
+        self.gold = gold
+        self.wood = wood
+        self.turns_taken = turns_taken
+        self.ids = ids
+
+
+def find_map(map_name):
+    """
+    Returns the path to a map.  map_name may either be a path to a map file or
+    the name of one of the maps in resources/maps, which is looked for as a
+    .wcm file and then as a .wcmb file.
+    """
+    if os.path.isfile(map_name):
+        return map_name
+    path = os.path.join(_map_dir, map_name + ".wcm")
+    binary_path = path + "b"
+    if not os.path.isfile(path) and os.path.isfile(binary_path):
+        return binary_path
+    return path
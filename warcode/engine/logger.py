@@ -1,27 +1,145 @@
-import sys
+import json
+import threading
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
 
 class Logger:
-    def __init__(self, output=None):
-        self.output = output or sys.stdout
+    """
+    Collects messages about what players do and writes them out in batches.
+
+    Messages below the logger's level are dropped straight away.  The others
+    are kept, with their arguments still unformatted, in a buffer that is
+    written out when it fills up, when flush is called, or, if a flush
+    interval is given, by a background thread.
 
-    def log(self, player, text):
+    Messages are written as text lines of the form "RED player 42> message" to
+    output, and, if jsonl is given, as json lines with the turn, level, event
+    code, team, robot id, and message.
+    """
+    def __init__(self, output=None, level=DEBUG, jsonl=None, buffer_size=1000,
+                 flush_interval=None):
         """
-        Logs a piece of text.
+        output:  file to write text lines to, or None for no text
+        level:  lowest level of message to keep
+        jsonl:  path of a file to write json lines to, or None
+        buffer_size:  number of messages to keep before writing them out
+        flush_interval:  if given, seconds between flushes by a background
+                thread
+        """
+        self.output = output
+        self.level = level
+        self.jsonl = open(jsonl, "w") if jsonl else None
+        self.buffer_size = buffer_size
+        self.buffer = []
+        # lock guards the buffer, and write_lock keeps batches in order when
+        # two threads flush at once.
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        # The game's current turn, which new messages are stamped with.
+        self.turn = 0
+
+        self.stopped = threading.Event()
+        self.thread = None
+        if flush_interval:
+            self.thread = threading.Thread(target=self.run, args=(flush_interval,),
+                                           name="logger", daemon=True)
+            self.thread.start()
+
+    def enabled(self, level):
         """
-        for line in text.split("\n"):
-            self.logline(player, line + "\n")
+        Returns whether messages of the given level are kept.
+        """
+        return level >= self.level
+
+    def log(self, player, text, *args, level=INFO, event="message"):
+        """
+        Logs a message from or about a player.  If args are given, the message
+        is text.format(*args), formatted only when it is written out.
+        """
+        if level < self.level:
+            return
+        record = (self.turn, level, event, player.robot.team, player.robot.id, text, args)
+        with self.lock:
+            self.buffer.append(record)
+            full = len(self.buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def debug(self, player, text, *args, event="message"):
+        self.log(player, text, *args, level=DEBUG, event=event)
+
+    def warning(self, player, text, *args, event="message"):
+        self.log(player, text, *args, level=WARNING, event=event)
+
+    def error(self, player, text, *args, event="error"):
+        self.log(player, text, *args, level=ERROR, event=event)
 
     def log_action(self, player, action):
         """
         Logs an action
         """
-        self.logline(player, "Action is '" + action + "'\n")
+        self.log(player, "Action is '{}'", action, level=DEBUG, event="action")
 
     def logline(self, player, line):
         """
-        Logs a line.  Line should end in "\n"
+        Logs a line the player's code wrote to stderr.  Line should end in "\\n"
         """
-        self.output.write(player.robot.team.to_string() + " player " + str(player.robot.id) + "> " + line)
+        self.log(player, line[:-1] if line.endswith("\n") else line, event="stderr")
 
     def flush(self):
-        self.output.flush()
+        """
+        Write out every buffered message.
+        """
+        with self.write_lock:
+            with self.lock:
+                records, self.buffer = self.buffer, []
+            if records:
+                self.write(records)
+
+    def write(self, records):
+        if self.output:
+            lines = []
+            for turn, level, event, team, id, text, args in records:
+                prefix = team.to_string() + " player " + str(id) + "> "
+                message = text.format(*args) if args else text
+                for line in message.split("\n"):
+                    lines.append(prefix + line + "\n")
+            self.output.write("".join(lines))
+            self.output.flush()
+
+        if self.jsonl:
+            self.jsonl.write("".join(
+                json.dumps({
+                    "turn": turn,
+                    "level": _LEVEL_NAMES.get(level, level),
+                    "event": event,
+                    "team": team.to_string(),
+                    "robot": id,
+                    "message": text.format(*args) if args else text,
+                }) + "\n"
+                for turn, level, event, team, id, text, args in records
+            ))
+            self.jsonl.flush()
+
+    def run(self, flush_interval):
+        while not self.stopped.wait(flush_interval):
+            self.flush()
+
+    def close(self):
+        """
+        Stop the background thread, write out every buffered message, and
+        close the json lines file.  output is left open.
+        """
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        if self.jsonl:
+            self.jsonl.close()
+            self.jsonl = None
@@ -1,86 +1,504 @@
+from contextlib import contextmanager
 from subprocess import Popen, PIPE
+import importlib.util
+import os
 import os.path
 import psutil
+import selectors
+import sys
 import time
 import traceback
 
-from ..common.errors import LanguageError
+from ..common.errors import GameException, InvalidLanguageError
+from .protocol import create_protocol
 
-class Player:
+# How often, in seconds, to check the CPU time of sandboxed code while
+# waiting for it.
+_CPU_POLL_INTERVAL = 0.002
+
+# Longest line we accept from a player, on stdout or stderr.
+LINE_LIMIT = 2 ** 20
+
+# poll() does not hold a file descriptor per selector, unlike epoll, which
+# matters when there are hundreds of processes alive at once.
+_Selector = getattr(selectors, "PollSelector", selectors.SelectSelector)
+
+class BotProcess:
     """
-    A Player runs a competitor's code for a certain robot
+    A running copy of a competitor's code that we talk to over pipes.
     """
-    def __init__(self, path_to_code, language, robot):
+    def __init__(self, path_to_code, language, cooperative=False, args=(), zygote=None,
+                 sandbox=None):
         """
-        Start a player's code
+        Start a competitor's code
+
+        path_to_code:  directory containing the competitor's main.py
+        language:  language the competitor's code is written in
+        cooperative:  if True, trust the code to block on stdin while it waits
+                for input instead of suspending and resuming the process with
+                signals.
+        args:  extra command line arguments to give the code
+        zygote:  if given, a Zygote for the code to fork the process from
+                instead of starting a new interpreter
+        sandbox:  if given, a Sandbox to run the code in.  Its time limits are
+                then judged on CPU time.  A zygote must have been started in
+                the same sandbox.
+        """
+        self.sandbox = sandbox
+        self.cpu_deadline = None
+        if zygote:
+            self.process = zygote.spawn(args)
+        elif language == "python":
+            command = ["python", os.path.join(path_to_code, "main.py")] + list(args)
+            # Create a process.  The PIPE's are used to communicate to stdin and
+            # get the stdout and stderr.
+            if sandbox:
+                self.process = sandbox.popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+            else:
+                self.process = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        else:
+            raise InvalidLanguageError("Sorry, but " + language + " is not supported.")
+
+        # Wake up as soon as the code writes something instead of polling.
+        self.selector = _Selector()
+        self.selector.register(self.process.stdout, selectors.EVENT_READ, "stdout")
+        self.selector.register(self.process.stderr, selectors.EVENT_READ, "stderr")
+        self.stdout_buffer = bytearray()
+        # How much of stdout_buffer is known to hold no newline.
+        self.stdout_scanned = 0
+        self.stderr_buffer = b""
+
+        # Name of the protocol picked by the code, once it has been asked.
+        self.protocol_name = None
+
+        # Used to pause and resume the process
+        self.ps_process = None
+        if not cooperative:
+            self.ps_process = psutil.Process(self.process.pid)
+            self.pause()
+
+    def start_clock(self, time_limit):
         """
+        Start timing a turn with a time limit in milliseconds.  Returns the
+        deadline, measured with time.monotonic(), to give read_line.
 
-        self.robot = robot
+        Sandboxed code is judged on the CPU time it uses instead:  the deadline
+        is the sandbox's wall clock cap, and read_line also gives up as soon
+        as the code has used time_limit of CPU time.
+        """
+        if self.sandbox is None:
+            return time.monotonic() + time_limit / 1000
+        self.cpu_deadline = self.sandbox.cpu_time(self.process.pid) + time_limit / 1000
+        return time.monotonic() + time_limit / 1000 * self.sandbox.wall_factor
+
+    def write(self, data):
+        """
+        Write bytes to the process's stdin.
+        """
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def negotiate(self, protocols, deadline, logger=None, player=None):
+        """
+        Offer the code a choice of protocols (see protocol.py) and return the
+        name of the one it picks.  The code is only asked once.
+        """
+        if self.protocol_name is None:
+            self.write(("PROTOCOLS " + " ".join(protocols) + "\n").encode())
+            line = self.read_line(deadline, logger, player)
+            words = line.split() if line is not None else []
+            if len(words) != 2 or words[0] != "PROTOCOL" or words[1] not in protocols:
+                raise GameException("Did not pick one of the protocols offered: " + repr(line))
+            self.protocol_name = words[1]
+        return self.protocol_name
+
+    def read_line(self, deadline, logger=None, player=None):
+        """
+        Wait until the process prints a full line to stdout and return it
+        (without the newline).  Returns None if the deadline, measured with
+        time.monotonic(), passes first, if the process runs out of CPU time
+        (see start_clock), or if the process's stdout is closed.
+
+        Anything written to stderr in the meantime is logged as coming from
+        player.  Raises GameException if the line is longer than LINE_LIMIT.
+        """
+        while True:
+            # Only the data read since the last search can hold a newline.
+            newline = self.stdout_buffer.find(b"\n", self.stdout_scanned)
+            if newline >= 0:
+                line = bytes(self.stdout_buffer[:newline])
+                del self.stdout_buffer[:newline + 1]
+                self.stdout_scanned = 0
+                return line.decode()
+            self.stdout_scanned = len(self.stdout_buffer)
+            if self.stdout_scanned > LINE_LIMIT:
+                self.stdout_buffer = bytearray()
+                self.stdout_scanned = 0
+                raise GameException("Line longer than {} bytes".format(LINE_LIMIT))
+
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return None
+            if self.cpu_deadline is not None:
+                if self.sandbox.cpu_time(self.process.pid) >= self.cpu_deadline:
+                    return None
+                timeout = min(timeout, _CPU_POLL_INTERVAL)
+
+            for key, _ in self.selector.select(timeout):
+                data = os.read(key.fd, 65536)
+                if key.data == "stdout":
+                    if not data:
+                        return None # The code has terminated.
+                    self.stdout_buffer += data
+                elif data:
+                    self.stderr_buffer += data
+                    self.log_stderr(logger, player)
+                else:
+                    self.selector.unregister(key.fileobj)
+
+    def log_stderr(self, logger=None, player=None):
+        """
+        Print out the complete lines the process has written to stderr.  A
+        line longer than LINE_LIMIT is printed in pieces.
+        """
+        *lines, self.stderr_buffer = self.stderr_buffer.split(b"\n")
+        if len(self.stderr_buffer) > LINE_LIMIT:
+            lines.append(self.stderr_buffer)
+            self.stderr_buffer = b""
+        if logger and player:
+            for line in lines:
+                logger.logline(player, line.decode(errors="replace") + "\n")
+
+    def pause(self):
+        """
+        Pause the execution of the code.
+        """
+        if self.ps_process:
+            self.ps_process.suspend()
+
+    def unpause(self):
+        """
+        Resume the execution of the code.
+        """
+        if self.ps_process:
+            self.ps_process.resume()
 
-        if language == "python":
-            command = ["python", os.path.join(path_to_code, "main.py")]
+    def kill(self):
+        """
+        Kill the process
+        """
+        self.selector.close()
+        if self.sandbox and isinstance(self.process, Popen):
+            # Processes forked by a zygote are killed by the zygote's rules.
+            self.sandbox.kill(self.process)
         else:
-            raise LanguageError("Sorry, but " + language + " is not supported.")
+            self.process.kill()
+            self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
 
-        # Create a process.  The PIPE's are used to communicate to stdin and get
-        # the stdout and stderr.
-        self.process = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE)
 
-        # Used to pause and resume the process
-        self.ps_process = psutil.Process(self.process.pid)
-        self.pause()
+class Player:
+    """
+    A Player runs a competitor's code for a certain robot
+    """
+    def __init__(self, path_to_code, language, robot, cooperative=False, zygote=None,
+                 protocols=None, segment=None, sandbox=None):
+        """
+        Start a player's code
 
+        path_to_code:  directory containing the player's main.py
+        language:  language the player is written in
+        robot:  the robot this player controls
+        cooperative:  if True, trust the player to block on stdin between
+                turns instead of suspending and resuming its process with
+                signals every turn.
+        zygote:  if given, a Zygote to fork the player's process from
+        protocols:  if given, the names of the protocols to let the player
+                choose from on its first turn.  Otherwise it gets json.
+        segment:  the SharedSegment to use if the player picks shm
+        sandbox:  if given, the Sandbox to run the player's code in
+        """
+        self.robot = robot
+        self.turns_taken = 0
+        self.protocols = protocols
+        self.protocol = None
+        self.segment = segment
+        # A Profiler to record how long each phase of a turn takes, if any.
+        self.profiler = None
+        self.process = BotProcess(path_to_code, language, cooperative, zygote=zygote,
+                                  sandbox=sandbox)
 
-    def run_turn(self, input, time_limit=20, logger=None):
+    def run_turn(self, observation, time_limit=20, logger=None):
         """
         Runs the player's code for a turn, returning the actions the player takes.
 
-        input:  A single line, ending with "\n", to print to the player's stdin
-                before the player runs its code.  It should be a json encoded
-                object.
+        observation:  What the robot can see this turn.  It is sent to the
+                player's stdin encoded with the player's protocol.
         time_limit:  Time limit, in milliseconds, for player to output action.
                 If not printed in that time, the player is killed.
         """
+        self.turns_taken += 1
+        line = None
         try:
-            self.process.stdin.write(input)
-            self.unpause()
-
-            start_time = time.time()
-            while time.time() < start_time + time_limit / 1000:
-                # Print out stderr from the player
-                if logger:
-                    for line in iter(process.stderr.readline, b''):
-                        logger.logline(self, line)
-
-                line = process.stdout.readline()
-                if line:
-                    self.pause()
-                    return line
-                time.sleep(0.0001) # Sleep for 0.1 ms
-
-            self.pause()
-        except:
+            deadline = self.process.start_clock(time_limit)
+            self.process.unpause()
+            if self.protocol is None:
+                self.protocol = create_protocol(
+                    self.process.negotiate(self.protocols, deadline, logger, self)
+                    if self.protocols else "json",
+                    self.segment,
+                )
+            if self.profiler:
+                line = self.run_profiled_turn(observation, deadline, logger)
+            else:
+                self.process.write(self.protocol.encode(observation))
+                line = self.read_actions(deadline, logger)
+            self.process.pause()
+            if line is None and logger:
+                logger.warning(self, "Ran out of time", event="timeout")
+        except Exception:
             if logger:
-                logger.log(traceback.format_exc())
-        finally:
-            # Kill the robot if the player doesn't return in time or throws an
-            # error
+                logger.error(self, traceback.format_exc())
+
+        # Kill the robot if the player doesn't return in time or throws an
+        # error
+        if line is None:
             return "EXPLODE"
+        return line
 
-    def pause(self):
+    def run_profiled_turn(self, observation, deadline, logger=None):
         """
-        Pause the execution of the player's code.
+        Send the observation and wait for the player's actions, recording how
+        long each phase takes in self.profiler.
         """
-        self.ps_process.suspend()
+        id = self.robot.id
+        start_time = time.perf_counter()
+        data = self.protocol.encode(observation)
+        start_time = self.profiler.record_since(id, "serialize", start_time)
+        self.process.write(data)
+        start_time = self.profiler.record_since(id, "write", start_time)
+        line = self.read_actions(deadline, logger)
+        self.profiler.record_since(id, "think", start_time)
+        return line
 
-    def unpause(self):
+    def read_actions(self, deadline, logger=None):
         """
-        Resume the execution of  the player's code.
+        Wait for the player's line of actions.  Returns None if it does not
+        arrive before the deadline.
         """
-        self.ps_process.resume()
+        return self.process.read_line(deadline, logger, self)
+
+    def resync(self):
+        """
+        Send the whole observation next turn, for a player that asked to RESYNC.
+        """
+        if self.protocol:
+            self.protocol.resync()
 
     def kill_process(self):
         """
         Kill our process
         """
         self.process.kill()
+
+
+class MultiplexedPlayer(Player):
+    """
+    A Player for one robot of a team whose robots all share a single process.
+
+    Observations are sent to the shared process with the robot's id in them,
+    and the process answers with a line of the form "<id> <actions>".
+    Answers meant for another robot, for example one that already ran out of
+    time, are thrown away.
+    """
+    def __init__(self, process, robot, protocols=None, segment=None):
+        """
+        process:  the BotProcess shared by the robot's team
+        robot:  the robot this player controls
+        protocols:  if given, the names of the protocols to let the process
+                choose from.  It is only asked once.
+        segment:  the SharedSegment to use if the process picks shm
+        """
+        self.robot = robot
+        self.turns_taken = 0
+        self.protocols = protocols
+        self.protocol = None
+        self.segment = segment
+        self.profiler = None
+        self.process = process
+
+    def read_actions(self, deadline, logger=None):
+        tag = str(self.robot.id)
+        while True:
+            line = self.process.read_line(deadline, logger, self)
+            if line is None:
+                return None
+            id, _, actions = line.partition(" ")
+            if id == tag:
+                return actions
+            if logger:
+                logger.warning(self, "Discarding late answer for robot {}", id, event="late_answer")
+
+    def kill_process(self):
+        """
+        The process is shared with the rest of the team, so it is left running.
+        """
+        pass
+
+
+class InProcessBot:
+    """
+    A bot's main.py, imported into the engine's process (not as __main__).
+
+    The modules the bot imports from its own directory are kept apart from
+    every other bot's, so that two bots that both have a protocol.py each get
+    their own.  They are only in sys.modules, and the bot's directory only on
+    sys.path, while the bot's code runs inside active().
+    """
+    def __init__(self, path_to_code, name):
+        """
+        path_to_code:  directory containing the bot's main.py
+        name:  name to import main.py under
+        """
+        self.directory = os.path.dirname(os.path.abspath(os.path.join(path_to_code, "main.py")))
+        # Modules imported from the bot's directory, by name.
+        self.modules = {}
+        with self.active():
+            spec = importlib.util.spec_from_file_location(
+                name, os.path.join(self.directory, "main.py"))
+            self.module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self.module)
+
+    @contextmanager
+    def active(self):
+        """
+        Put the bot's directory on sys.path and its modules in sys.modules for
+        the duration of the with block.
+        """
+        sys.path.insert(0, self.directory)
+        shadowed = {name: sys.modules.get(name) for name in self.modules}
+        sys.modules.update(self.modules)
+        module_count = len(sys.modules)
+        try:
+            yield
+        finally:
+            if len(sys.modules) != module_count:
+                self.modules.update(self.own_modules())
+            for name in self.modules:
+                if shadowed.get(name) is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = shadowed[name]
+            sys.path.remove(self.directory)
+
+    def own_modules(self):
+        """
+        Returns the modules in sys.modules that were loaded from the bot's
+        directory, by name.
+        """
+        prefix = self.directory + os.sep
+        return {
+            name: module
+            for name, module in list(sys.modules.items())
+            if os.path.abspath(getattr(module, "__file__", None) or os.sep).startswith(prefix)
+        }
+
+
+# In-process bots, by path to their main.py, so that each bot's code is only
+# imported once however many robots it plays.
+_bots = {}
+
+def import_bot(path_to_code):
+    """
+    Import a bot's main.py and return its InProcessBot.
+    """
+    main_path = os.path.abspath(os.path.join(path_to_code, "main.py"))
+    if main_path not in _bots:
+        _bots[main_path] = InProcessBot(path_to_code, "__warcode_bot_{}__".format(len(_bots)))
+    return _bots[main_path]
+
+
+class InProcessPlayer:
+    """
+    A Player for trusted code that runs inside the engine's own process.  The
+    code's main.py is imported once and its turn(observation) function is
+    called with the observation as python objects.  It must return a list of
+    actions.
+
+    Apart from its imports (see InProcessBot), the code is not isolated in any
+    way, and the time limit is only checked after turn returns:  a turn that
+    takes too long kills the robot but is not interrupted.
+    """
+    language = "python-inprocess"
+
+    def __init__(self, path_to_code, robot):
+        """
+        path_to_code:  directory containing the player's main.py
+        robot:  the robot this player controls
+        """
+        self.robot = robot
+        self.turns_taken = 0
+        self.profiler = None
+        self.bot = import_bot(path_to_code)
+
+    def run_turn(self, observation, time_limit=20, logger=None):
+        """
+        Runs the player's code for a turn, returning the actions the player
+        takes as a semicolon separated string, like Player.run_turn.
+        """
+        self.turns_taken += 1
+        line = None
+        try:
+            start_time = time.perf_counter()
+            with self.bot.active():
+                actions = self.bot.module.turn(observation)
+            if (time.perf_counter() - start_time) * 1000 <= time_limit:
+                line = ";".join(actions)
+            elif logger:
+                logger.warning(self, "Ran out of time", event="timeout")
+        except Exception:
+            if logger:
+                logger.error(self, traceback.format_exc())
+
+        if line is None:
+            return "EXPLODE"
+        return line
+
+    def resync(self):
+        pass
+
+    def kill_process(self):
+        pass
+
+
+class HeadlessPlayer:
+    """
+    Stands in for a Player in games whose actions do not come from a bot, such
+    as resimulations, batched games, and benchmarks.  It runs no code:  its
+    turn is script(observation), or WAIT without a script, and games that
+    supply the actions themselves never ask it for a turn at all.
+    """
+    def __init__(self, robot, script=None):
+        """
+        robot:  the robot this player controls
+        script:  if given, a function of the observation that returns the
+                actions as a semicolon separated string
+        """
+        self.robot = robot
+        self.script = script
+        self.turns_taken = 0
+        self.profiler = None
+
+    def run_turn(self, observation, time_limit=20, logger=None):
+        self.turns_taken += 1
+        return self.script(observation) if self.script else "WAIT"
+
+    def resync(self):
+        pass
+
+    def kill_process(self):
+        pass
@@ -0,0 +1,95 @@
+from collections import deque
+import csv
+import json
+import time
+
+from .stats import Stats
+
+class Profiler:
+    """
+    Records how long each phase of each robot's turn takes, in milliseconds.
+    The phases are:
+
+        observation:  building the robot's observation
+        turn:  all of the player's run_turn, which is made up of
+        serialize:  encoding the observation with the player's protocol
+        write:  writing it to the player's process
+        think:  waiting for the player's actions
+        actions:  parsing and applying the actions
+        spawn:  creating a player for a new robot
+        kill:  stopping a dead robot's player
+
+    Only the newest records are kept, in a ring buffer of the given capacity.
+    Each record is (turn, robot id, phase, milliseconds).
+    """
+    def __init__(self, capacity=1000000):
+        self.records = deque(maxlen=capacity)
+        # The game's current turn, which new records are stamped with.
+        self.turn = 0
+
+    def record(self, robot_id, phase, milliseconds):
+        """
+        Add a record for the current turn.
+        """
+        self.records.append((self.turn, robot_id, phase, milliseconds))
+
+    def record_since(self, robot_id, phase, start_time):
+        """
+        Add a record of the time since start_time, taken from
+        time.perf_counter().  Returns the time now, for timing the next phase.
+        """
+        now = time.perf_counter()
+        self.records.append((self.turn, robot_id, phase, (now - start_time) * 1000))
+        return now
+
+    def summary(self, percents=(50, 95, 99)):
+        """
+        Returns a dictionary of phase to the count, mean, and percentiles of
+        its times, as Stats.summary does.
+        """
+        stats = Stats()
+        for _, _, phase, milliseconds in self.records:
+            stats.record(phase, milliseconds)
+        return stats.summary(percents)
+
+    def report(self, percents=(50, 95, 99)):
+        """
+        Returns the summary as a table, one line per phase.
+        """
+        columns = ["p{}".format(percent) for percent in percents]
+        lines = ["{:<12}{:>9}{:>10}".format("phase", "count", "mean") +
+                 "".join("{:>10}".format(column) for column in columns)]
+        for phase, row in sorted(self.summary(percents).items()):
+            lines.append("{:<12}{:>9}{:>10.3f}".format(phase, row["count"], row["mean"]) +
+                         "".join("{:>10.3f}".format(row[column]) for column in columns))
+        return "\n".join(lines)
+
+    def to_json(self, path):
+        """
+        Write the records and their summary to a json file.
+        """
+        with open(path, "w") as file:
+            json.dump({
+                "fields": ["turn", "robot", "phase", "ms"],
+                "records": list(self.records),
+                "summary": self.summary(),
+            }, file)
+
+    def to_csv(self, path):
+        """
+        Write the records to a csv file.
+        """
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["turn", "robot", "phase", "ms"])
+            writer.writerows(self.records)
+
+    def save(self, path):
+        """
+        Write the records to path, as csv if it ends in .csv and as json
+        otherwise.
+        """
+        if path.endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.to_json(path)
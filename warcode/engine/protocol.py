@@ -0,0 +1,272 @@
+"""
+Protocols are the ways an observation can be written to a player's stdin.
+Unless the engine is told to offer others, every player gets "json":  the
+whole observation as one line of json.  Protocols encode observations to
+bytes.
+
+When other protocols are offered, the engine starts a player's first turn by
+writing the line
+
+    PROTOCOLS json delta ...
+
+and the player answers with the line
+
+    PROTOCOL <name>
+
+naming the one it wants, before the first observation is sent.
+"""
+from array import array
+import json
+import mmap
+import os
+import os.path
+import struct
+import tempfile
+
+from ..common import Team, Type
+
+class JsonProtocol:
+    """
+    Sends the whole observation every turn.
+    """
+    name = "json"
+
+    def encode(self, observation):
+        return (json.dumps(observation) + "\n").encode()
+
+    def resync(self):
+        pass
+
+
+class DeltaProtocol:
+    """
+    Sends the whole observation on the first turn and after a resync, and
+    only what changed since the player's previous observation otherwise.
+
+    A full observation is the usual json object with "seq" (a sequence number
+    counting up from 0) and "full": true added.  A delta is a json object with
+
+        "seq":  the sequence number
+        "full":  false
+        "id":  the robot's id
+        "tiles":  a list of [x, y, value] for every square of the map that
+                changed
+        "trees", "gold_mines", "robots":  the entities that are new or changed
+        "removed":  ids of entities that are no longer visible
+
+    A player that loses track (for example, seq is not one more than the last
+    one it saw) can include the action RESYNC to get a full observation next
+    turn.
+    """
+    name = "delta"
+
+    _ENTITY_KEYS = ("trees", "gold_mines", "robots")
+
+    def __init__(self):
+        self.sequence = 0
+        self.previous = None
+
+    def resync(self):
+        self.previous = None
+
+    def encode(self, observation):
+        entities = {
+            key: {entity["id"]: entity for entity in observation[key]}
+            for key in self._ENTITY_KEYS
+        }
+
+        if self.previous is None:
+            message = dict(observation)
+            message["full"] = True
+        else:
+            previous_board, previous_entities = self.previous
+            message = {"full": False, "id": observation["id"], "tiles": []}
+            for y, (row, previous_row) in enumerate(zip(observation["map"], previous_board)):
+                if row != previous_row:
+                    for x, (square, previous_square) in enumerate(zip(row, previous_row)):
+                        if square != previous_square:
+                            message["tiles"].append([x, y, square])
+
+            removed = []
+            for key in self._ENTITY_KEYS:
+                current = entities[key]
+                previous = previous_entities[key]
+                message[key] = [
+                    entity for id, entity in current.items() if previous.get(id) != entity
+                ]
+                removed.extend(id for id in previous if id not in current)
+            message["removed"] = removed
+
+        message["seq"] = self.sequence
+        self.sequence += 1
+        self.previous = (observation["map"], entities)
+        return (json.dumps(message) + "\n").encode()
+
+
+class BinaryProtocol:
+    """
+    Sends the whole observation every turn in a fixed binary layout instead of
+    json.  All numbers are little endian.  Each message is
+
+        uint32  number of bytes in the rest of the message
+        int32   the robot's id
+        uint16  width of the map
+        uint16  height of the map
+        int32   width * height squares of the map, row by row:  an id, or
+                EMPTY (0), WALL (-1), or UNKNOWN (-2)
+        uint16  number of trees, then of gold mines, then of robots
+        trees and gold mines:  uint16 x, uint16 y, int32 health, int32 id
+        robots:  uint16 x, uint16 y, uint8 type, uint8 team, int32 health,
+                int32 id
+
+    A robot's type is its index in Type.ALL_TYPES and its team is 0 for RED
+    and 1 for BLUE.
+    """
+    name = "binary"
+
+    EMPTY = 0
+    WALL = -1
+    UNKNOWN = -2
+
+    HEADER = struct.Struct("<iHH")
+    COUNTS = struct.Struct("<HHH")
+    RESOURCE = struct.Struct("<HHii")
+    ROBOT = struct.Struct("<HHBBii")
+
+    _SQUARE_CODES = {" ": EMPTY, "W": WALL, "?": UNKNOWN}
+    _TYPE_CODES = {type.name: index for index, type in enumerate(Type.ALL_TYPES)}
+    _TEAM_CODES = {Team.RED.to_string(): 0, Team.BLUE.to_string(): 1}
+
+    def encode(self, observation):
+        body = self.pack(observation)
+        return struct.pack("<I", len(body)) + body
+
+    def pack(self, observation):
+        """
+        Returns the observation in the binary layout, without its length.
+        """
+        board = observation["map"]
+        height = len(board)
+        width = len(board[0]) if height else 0
+        codes = self._SQUARE_CODES
+        parts = [
+            self.HEADER.pack(observation["id"], width, height),
+            array("i", [codes.get(square, square) for row in board for square in row]).tobytes(),
+            self.COUNTS.pack(len(observation["trees"]), len(observation["gold_mines"]),
+                             len(observation["robots"])),
+        ]
+        for key in ("trees", "gold_mines"):
+            for entity in observation[key]:
+                parts.append(self.RESOURCE.pack(entity["x"], entity["y"], entity["health"],
+                                                entity["id"]))
+        for robot in observation["robots"]:
+            parts.append(self.ROBOT.pack(robot["x"], robot["y"], self._TYPE_CODES[robot["type"]],
+                                         self._TEAM_CODES[robot["team"]], robot["health"],
+                                         robot["id"]))
+        return b"".join(parts)
+
+    def resync(self):
+        pass
+
+
+class SharedSegment:
+    """
+    A file in shared memory (/dev/shm where there is one) mapped into the
+    engine's memory, that players on the same machine can map too.  It holds
+
+        uint64  generation, counting up from 1 with every write
+        uint32  number of bytes written
+        the bytes written
+
+    Only one observation is kept at a time, so a team's robots, which take
+    their turns one after another, can share a segment.
+    """
+    HEADER = struct.Struct("<QI")
+
+    def __init__(self, size=2 ** 20):
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        fd, self.path = tempfile.mkstemp(prefix="warcode-", dir=directory)
+        self.file = os.fdopen(fd, "r+b")
+        self.generation = 0
+        self.memory = None
+        self.resize(size)
+
+    def resize(self, size):
+        """
+        Make the segment hold at least size bytes after its header.
+        """
+        if self.memory is not None:
+            self.memory.close()
+        self.file.truncate(self.HEADER.size + size)
+        self.memory = mmap.mmap(self.file.fileno(), self.HEADER.size + size)
+
+    def write(self, data):
+        """
+        Replace the contents of the segment.  Returns the new generation.
+        """
+        if self.HEADER.size + len(data) > len(self.memory):
+            self.resize(2 * len(data))
+        self.generation += 1
+        self.memory[self.HEADER.size:self.HEADER.size + len(data)] = data
+        self.HEADER.pack_into(self.memory, 0, self.generation, len(data))
+        return self.generation
+
+    def close(self):
+        """
+        Unmap and delete the segment.
+        """
+        self.memory.close()
+        self.file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class SharedMemoryProtocol:
+    """
+    Writes the observation, in the binary protocol's layout, to the team's
+    SharedSegment, and only sends the line
+
+        {"id": <robot id>, "generation": <generation>, "segment": <path>}
+
+    through the pipe.  For players on the same machine as the engine.
+
+    Each robot's observation is still packed on its own every turn, since
+    every robot sees its own fog of war; what this saves over the binary
+    protocol is copying the observation through the pipe.
+    """
+    name = "shm"
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.binary = BinaryProtocol()
+
+    def encode(self, observation):
+        generation = self.segment.write(self.binary.pack(observation))
+        return (json.dumps({
+            "id": observation["id"],
+            "generation": generation,
+            "segment": self.segment.path,
+        }) + "\n").encode()
+
+    def resync(self):
+        pass
+
+
+PROTOCOLS = {
+    JsonProtocol.name: JsonProtocol,
+    DeltaProtocol.name: DeltaProtocol,
+    BinaryProtocol.name: BinaryProtocol,
+    SharedMemoryProtocol.name: SharedMemoryProtocol,
+}
+
+
+def create_protocol(name, segment=None):
+    """
+    Returns a new protocol object for the protocol with the given name.  The
+    shm protocol needs the SharedSegment to write to.
+    """
+    if name == SharedMemoryProtocol.name:
+        return SharedMemoryProtocol(segment)
+    return PROTOCOLS[name]()
@@ -0,0 +1,85 @@
+from ..common import GoldMine, Robot, Team, Tree, Type
+
+class EntityRegistry:
+    """
+    Every tree, gold mine, and living robot in a game, keyed by id, with the
+    robots also grouped by team and by type.  Lookups, insertions, and removals
+    are all O(1).
+
+    Robots' health and type must be changed through the registry so that the
+    per-team totals and per-type views stay correct.
+    """
+    def __init__(self, trees=(), gold_mines=(), robots=()):
+        self.trees = {}
+        self.gold_mines = {}
+        self.robots = {}
+        self.robots_by_team = {team: {} for team in Team}
+        self.robots_by_type = {type: {} for type in Type.ALL_TYPES}
+        self.team_health = {team: 0 for team in Team}
+
+        for entity in list(trees) + list(gold_mines) + list(robots):
+            self.add(entity)
+
+    def get(self, id):
+        """
+        Returns the tree, gold mine, or robot with the given id, or None.
+        """
+        return self.robots.get(id) or self.trees.get(id) or self.gold_mines.get(id)
+
+    def __contains__(self, id):
+        return id in self.robots or id in self.trees or id in self.gold_mines
+
+    def add(self, entity):
+        """
+        Add a tree, gold mine, or robot.
+        """
+        if isinstance(entity, Robot):
+            self.robots[entity.id] = entity
+            self.robots_by_team[entity.team][entity.id] = entity
+            self.robots_by_type[entity.type][entity.id] = entity
+            self.team_health[entity.team] += entity.health
+        elif isinstance(entity, Tree):
+            self.trees[entity.id] = entity
+        elif isinstance(entity, GoldMine):
+            self.gold_mines[entity.id] = entity
+        else:
+            raise TypeError("Cannot register a " + type(entity).__name__)
+
+    def remove(self, entity):
+        """
+        Remove a tree, gold mine, or robot.  Removing something that is not
+        registered does nothing.
+        """
+        if isinstance(entity, Robot):
+            if self.robots.pop(entity.id, None) is None:
+                return
+            del self.robots_by_team[entity.team][entity.id]
+            del self.robots_by_type[entity.type][entity.id]
+            self.team_health[entity.team] -= entity.health
+        elif isinstance(entity, Tree):
+            self.trees.pop(entity.id, None)
+        elif isinstance(entity, GoldMine):
+            self.gold_mines.pop(entity.id, None)
+
+    def set_health(self, robot, health):
+        """
+        Change a robot's health.
+        """
+        if robot.id in self.robots:
+            self.team_health[robot.team] += health - robot.health
+        robot.health = health
+
+    def set_type(self, robot, type):
+        """
+        Change a robot's type, e.g. when it TRAINs.
+        """
+        if robot.id in self.robots:
+            del self.robots_by_type[robot.type][robot.id]
+            self.robots_by_type[type][robot.id] = robot
+        robot.type = type
+
+    def count(self, team):
+        """
+        Returns how many robots a team has.
+        """
+        return len(self.robots_by_team[team])
@@ -0,0 +1,176 @@
+"""
+Replays (.wcr files) record a game as it is played.  A replay is a gzip
+compressed stream of json lines.  The first line is the header:
+
+    {"type": "header", "version": 1, "map": <name>, "width": ..., "height": ...,
+     "bots": [<red>, <blue>], "keyframe_interval": K}
+
+It is followed by one line per turn (turn 0 being the start of the game).
+Every K turns, and on turn 0, the line is a keyframe holding the full state:
+
+    {"type": "keyframe", "turn": t, "actions": [...], "state": <state>}
+
+and on the other turns only what changed since the turn before:
+
+    {"type": "delta", "turn": t, "actions": [...], "tiles": [[x, y, square], ...],
+     "robots": {...}, "trees": {...}, "gold_mines": {...}, "removed": [ids],
+     "gold": {...}, "wood": {...}}
+
+"actions" is a list of [robot id, actions] in the order robots took their
+turns.  A state is
+
+    {"board": <rows of the board>, "robots": {id: [x, y, type, team, health]},
+     "trees": {id: [x, y, health]}, "gold_mines": {id: [x, y, health]},
+     "gold": {"RED": ..., "BLUE": ...}, "wood": {"RED": ..., "BLUE": ...}}
+
+Ids are json object keys, so they are strings in the file.
+"""
+import gzip
+import json
+import queue
+import threading
+
+VERSION = 1
+
+_ENTITY_KEYS = ("robots", "trees", "gold_mines")
+
+class ReplayWriter:
+    """
+    Writes a replay in a background thread so that the game does not wait for
+    encoding, compression, or the disk.  The game hands over copies of its
+    state through a bounded queue.
+    """
+    def __init__(self, path, map, bots, keyframe_interval=50, queue_size=64):
+        """
+        path:  file to write the replay to
+        map:  the game's Map
+        bots:  directories of the red and blue players' code
+        keyframe_interval:  number of turns between keyframes
+        queue_size:  number of turns that may wait to be written before the
+                game has to wait for the writer
+        """
+        self.keyframe_interval = keyframe_interval
+        self.queue = queue.Queue(queue_size)
+        self.error = None
+        self.file = gzip.open(path, "wt")
+        self.write_line({
+            "type": "header",
+            "version": VERSION,
+            "map": map.name,
+            "width": map.width,
+            "height": map.height,
+            "bots": list(bots),
+            "keyframe_interval": keyframe_interval,
+        })
+        self.previous = None
+        self.thread = threading.Thread(target=self.run, name="replay writer", daemon=True)
+        self.thread.start()
+
+    def record(self, turn, actions, map, robots, trees, gold_mines, gold, wood):
+        """
+        Record the state at the end of a turn.  map must be a copy that the
+        game will not change any more; the rest is copied here.
+        """
+        self.queue.put((turn, list(actions), map, {
+            "robots": {robot.id: [robot.x, robot.y, robot.type.to_string(),
+                                  robot.team.to_string(), robot.health]
+                       for robot in robots},
+            "trees": {tree.id: [tree.x, tree.y, tree.health] for tree in trees},
+            "gold_mines": {gold_mine.id: [gold_mine.x, gold_mine.y, gold_mine.health]
+                           for gold_mine in gold_mines},
+            "gold": dict(gold),
+            "wood": dict(wood),
+        }))
+
+    def close(self):
+        """
+        Wait for everything to be written and close the file.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                self.write_turn(*item)
+            except Exception as e:
+                self.error = e
+
+    def write_turn(self, turn, actions, map, state):
+        state["board"] = map.to_dict()["board"]
+        if self.previous is None or turn % self.keyframe_interval == 0:
+            self.write_line({"type": "keyframe", "turn": turn, "actions": actions, "state": state})
+        else:
+            self.write_line(delta(self.previous, state, turn, actions))
+        self.previous = state
+
+    def write_line(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def delta(previous, state, turn, actions):
+    """
+    Returns the delta record that turns the state previous into state.
+    """
+    tiles = []
+    for y, (row, previous_row) in enumerate(zip(state["board"], previous["board"])):
+        if row != previous_row:
+            for x, (square, previous_square) in enumerate(zip(row, previous_row)):
+                if square != previous_square:
+                    tiles.append([x, y, square])
+
+    record = {"type": "delta", "turn": turn, "actions": actions, "tiles": tiles}
+    removed = []
+    for key in _ENTITY_KEYS:
+        current = state[key]
+        old = previous[key]
+        record[key] = {id: value for id, value in current.items() if old.get(id) != value}
+        # Written as strings, like the ids that are json object keys.
+        removed.extend(str(id) for id in old if id not in current)
+    record["removed"] = removed
+    record["gold"] = state["gold"]
+    record["wood"] = state["wood"]
+    return record
+
+
+def read_replay(path):
+    """
+    Read a replay.  Returns (header, iterator of (turn, actions, state)), with
+    the full state rebuilt for every turn.
+    """
+    file = gzip.open(path, "rt")
+    header = json.loads(file.readline())
+
+    def states():
+        state = None
+        with file:
+            for line in file:
+                record = json.loads(line)
+                if record["type"] == "keyframe":
+                    state = record["state"]
+                else:
+                    state = {
+                        "board": [list(row) for row in state["board"]],
+                        "gold": record["gold"],
+                        "wood": record["wood"],
+                    }
+                    for x, y, square in record["tiles"]:
+                        state["board"][y][x] = square
+                    for key in _ENTITY_KEYS:
+                        state[key] = dict(previous[key])
+                        state[key].update(record[key])
+                    for id in record["removed"]:
+                        for key in _ENTITY_KEYS:
+                            state[key].pop(id, None)
+                previous = state
+                yield record["turn"], record["actions"], state
+
+    return header, states()
@@ -0,0 +1,70 @@
+"""
+Play action logs (see action_log.py) again without running any players' code.
+"""
+from ..common.errors import GameException
+from .action_log import read_action_log
+from .game import Game
+from .player import HeadlessPlayer
+
+
+class ResimulatedGame(Game):
+    """
+    A Game that takes its actions from an action log instead of from players.
+    """
+    def __init__(self, path, **kwargs):
+        """
+        path:  the action log to play
+        kwargs:  other options for Game, e.g. array_map
+        """
+        self.header, self.turn_records, self.result = read_action_log(path)
+        super().__init__(self.header["map"], None, None, seed=self.header["seed"], **kwargs)
+
+    def create_player(self, robot):
+        return HeadlessPlayer(robot)
+
+    def run(self):
+        """
+        Play the logged turns, checking the state against the log at every
+        checkpoint.  Raises GameException at the first difference.
+        """
+        self.going = True
+        for record in self.turn_records:
+            if not self.going:
+                raise GameException("Game ended on turn {} but the log goes on".format(self.turn))
+            self.turn = record["turn"]
+            for id, actions in record["actions"]:
+                player = self.players.get(id)
+                if player is None or player.robot.health <= 0:
+                    raise GameException(
+                        "Turn {}: robot {} is not alive to take its turn".format(self.turn, id))
+                player.turns_taken += 1
+                self.process_actions(actions, player)
+            self.end_turn()
+            if "hash" in record:
+                self.check_hash(record["hash"])
+
+        if self.result:
+            if self.going:
+                raise GameException("Game did not end on turn {}".format(self.turn))
+            self.check_hash(self.result["hash"])
+            winner = self.get_winner()
+            if winner.to_string() != self.result["winner"]:
+                raise GameException("Winner is {} instead of {}".format(
+                    winner.to_string(), self.result["winner"]))
+        self.winner = self.get_winner()
+        return self.winner
+
+    def check_hash(self, expected):
+        actual = self.state_hash()
+        if actual != expected:
+            raise GameException("Turn {}: state hash is {} instead of {}".format(
+                self.turn, actual, expected))
+
+
+def resimulate(path, **kwargs):
+    """
+    Play an action log again without running any of the players' code.
+    Returns the winner, or raises GameException if the engine no longer
+    reaches the logged states.
+    """
+    return ResimulatedGame(path, **kwargs).run()
@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+class Stats:
+    """
+    Collects samples of named quantities over a game, e.g. how many
+    milliseconds it took to spawn each robot.
+    """
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def record(self, name, value):
+        """
+        Add a sample of the quantity called name.
+        """
+        self.samples[name].append(value)
+
+    def percentiles(self, name, percents=(50, 90, 99)):
+        """
+        Returns a dictionary of percent to the nearest-rank percentile of the
+        samples of name, or None for each if there are no samples.
+        """
+        values = sorted(self.samples[name])
+        if not values:
+            return {percent: None for percent in percents}
+        return {
+            percent: values[max(0, -(-percent * len(values) // 100) - 1)]
+            for percent in percents
+        }
+
+    def summary(self, percents=(50, 90, 99)):
+        """
+        Returns a dictionary of name to the count, mean, and percentiles (by
+        default p50/p90/p99) of its samples.
+        """
+        summary = {}
+        for name, values in self.samples.items():
+            if not values:
+                continue
+            percentiles = self.percentiles(name, percents)
+            summary[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+            }
+            for percent in percents:
+                summary[name]["p{}".format(percent)] = percentiles[percent]
+        return summary
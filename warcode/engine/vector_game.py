@@ -0,0 +1,201 @@
+"""
+Many headless games stepped together, for training policies against the
+engine.  Nothing here starts a process:  the actions for every robot come
+from the caller, one batch per turn.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from ..common import ArrayMap, Team, Type
+from .game import Game
+from .player import HeadlessPlayer
+
+# What each square of a crop holds.  Squares outside of the robot's vision are
+# UNKNOWN, and squares off the edge of the map are walls.
+EMPTY = ArrayMap.EMPTY
+WALL = ArrayMap.WALL
+TREE = ArrayMap.TREE
+GOLD_MINE = ArrayMap.GOLD_MINE
+FRIENDLY_ROBOT = 4
+ENEMY_ROBOT = 5
+UNKNOWN = ArrayMap.UNKNOWN
+
+# Columns of VectorGame's robots array.
+ROBOT_FIELDS = ("id", "x", "y", "type", "team", "health")
+
+_TEAM_INDEX = {Team.RED: 0, Team.BLUE: 1}
+_TYPE_INDEX = {type: index for index, type in enumerate(Type.ALL_TYPES)}
+
+
+class BatchedGame(Game):
+    """
+    A Game on an ArrayMap whose robots are all HeadlessPlayers.  Their
+    actions are given to VectorGame.step.
+    """
+    def __init__(self, map_name, seed=None):
+        super().__init__(map_name, None, None, array_map=True, seed=seed)
+
+    def create_player(self, robot):
+        return HeadlessPlayer(robot)
+
+
+class VectorGame:
+    """
+    Steps a batch of games in lockstep, a whole turn of every game at a time.
+
+    Every game has max_robots slots.  Each turn the living robots of a game
+    fill its slots in the order they take their turns, and the observation
+    and the actions for a robot are in its slot.  Robots beyond max_robots
+    WAIT.  A game that ends is put back to its start and played again.
+    """
+    def __init__(self, map_names, max_robots=64, crop_radius=None, seed=0):
+        """
+        map_names:  the map of each game in the batch
+        max_robots:  number of robot slots per game
+        crop_radius:  half the width of the square of the board each robot
+                sees, centred on the robot.  Defaults to enough to hold the
+                largest vision radius.
+        seed:  seed of the first game; game i gets seed + i
+        """
+        if numpy is None:
+            raise ImportError("numpy is needed to use a VectorGame.")
+
+        self.max_robots = max_robots
+        self.crop_radius = crop_radius
+        if crop_radius is None:
+            self.crop_radius = int(max(type.vision_radius for type in Type.ALL_TYPES) ** 0.5)
+        size = 2 * self.crop_radius + 1
+
+        self.games = [BatchedGame(map_name, seed + index)
+                      for index, map_name in enumerate(map_names)]
+        self.starts = []
+        for game in self.games:
+            game.going = True
+            self.starts.append(game.snapshot())
+
+        # Which squares of a crop each vision radius can see.
+        offsets = numpy.arange(size) - self.crop_radius
+        distances = offsets[None, :] ** 2 + offsets[:, None] ** 2
+        self.vision_masks = {
+            type.vision_radius: distances <= type.vision_radius for type in Type.ALL_TYPES
+        }
+
+        count = len(self.games)
+        self.slots = [[] for _ in self.games]
+        self.crops = numpy.full((count, max_robots, size, size), UNKNOWN, dtype=numpy.uint8)
+        self.robots = numpy.zeros((count, max_robots, len(ROBOT_FIELDS)), dtype=numpy.int32)
+        self.alive = numpy.zeros((count, max_robots), dtype=bool)
+        self.resources = numpy.zeros((count, max_robots, 2), dtype=numpy.int32)
+        self.dones = numpy.zeros(count, dtype=bool)
+        self.winners = numpy.zeros(count, dtype=numpy.int8)
+
+    def __len__(self):
+        return len(self.games)
+
+    def reset(self):
+        """
+        Put every game back to its start.  Returns the observation.
+        """
+        for game, start in zip(self.games, self.starts):
+            game.restore(start)
+        for index in range(len(self.games)):
+            self.observe(index)
+        return self.observation()
+
+    def step(self, actions):
+        """
+        Play a turn of every game.
+
+        actions:  for each game, a sequence of max_robots action strings (as
+                a player would print them, e.g. "MOVE 3 4;ATTACK 4 4"), one
+                per slot of the last observation.  Empty slots are ignored.
+
+        Returns the observation.  Its "done" entry says which games ended on
+        this turn, and "winner" who won them (1 for RED, 2 for BLUE).  Those
+        games have already been put back to their start, and the rest of the
+        observation is of the new game.
+        """
+        self.dones[:] = False
+        self.winners[:] = 0
+        for index, game in enumerate(self.games):
+            game.turn += 1
+            game_actions = actions[index]
+            for slot, player in enumerate(self.slots[index]):
+                if player.robot.health > 0:
+                    player.turns_taken += 1
+                    game.process_actions(game_actions[slot], player)
+            game.end_turn()
+
+            if not game.going:
+                self.dones[index] = True
+                self.winners[index] = _TEAM_INDEX[game.get_winner()] + 1
+                game.restore(self.starts[index])
+            self.observe(index)
+        return self.observation()
+
+    def observation(self):
+        """
+        Returns the arrays describing every game, as a dict:
+
+        "crops":  (games, max_robots, size, size) uint8 squares around each
+                robot, using the constants at the top of this module
+        "robots":  (games, max_robots, len(ROBOT_FIELDS)) int32 id, position,
+                index in Type.ALL_TYPES, team (0 for RED, 1 for BLUE), and
+                health of each robot
+        "alive":  (games, max_robots) bool, which slots hold a robot
+        "resources":  (games, max_robots, 2) int32 gold and wood of each
+                robot's team
+        "turn":  (games,) int32 turn each game is on
+        "done", "winner":  see step
+
+        The arrays are reused, so they must be copied to be kept past the next
+        step.
+        """
+        return {
+            "crops": self.crops,
+            "robots": self.robots,
+            "alive": self.alive,
+            "resources": self.resources,
+            "turn": numpy.array([game.turn for game in self.games], dtype=numpy.int32),
+            "done": self.dones,
+            "winner": self.winners,
+        }
+
+    def observe(self, index):
+        """
+        Fill in game index's slots of the observation arrays.
+        """
+        game = self.games[index]
+        radius = self.crop_radius
+        size = 2 * radius + 1
+
+        # The board from each team's point of view, padded with walls so that
+        # crops near the edge do not need clipping.
+        robot_squares = game.map.kinds == ArrayMap.ROBOT
+        boards = {}
+        for team in Team:
+            mine = numpy.zeros(robot_squares.shape, dtype=bool)
+            for robot in game.registry.robots_by_team[team].values():
+                mine[robot.y, robot.x] = True
+            board = game.map.kinds.copy()
+            board[robot_squares] = ENEMY_ROBOT
+            board[mine] = FRIENDLY_ROBOT
+            boards[team] = numpy.pad(board, radius, mode="constant", constant_values=WALL)
+
+        players = [player for player in game.players.values() if player.robot.health > 0]
+        self.slots[index] = players[:self.max_robots]
+        self.crops[index] = UNKNOWN
+        self.robots[index] = 0
+        self.alive[index] = False
+        self.resources[index] = 0
+        for slot, player in enumerate(self.slots[index]):
+            robot = player.robot
+            crop = boards[robot.team][robot.y:robot.y + size, robot.x:robot.x + size]
+            self.crops[index, slot] = numpy.where(
+                self.vision_masks[robot.type.vision_radius], crop, UNKNOWN)
+            self.robots[index, slot] = (robot.id, robot.x, robot.y, _TYPE_INDEX[robot.type],
+                                        _TEAM_INDEX[robot.team], robot.health)
+            self.alive[index, slot] = True
+            self.resources[index, slot] = (game.get_gold(robot.team), game.get_wood(robot.team))
@@ -0,0 +1,55 @@
+from ..common.disc import disc_offsets
+
+class Vision:
+    """
+    The squares that a robot at (x, y) with a certain vision radius can see.
+    """
+    def __init__(self, map, x, y, radius):
+        self.map = map
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.squares = tuple(
+            (x + dx, y + dy)
+            for dx, dy in disc_offsets(radius)
+            if 0 <= x + dx < map.width and 0 <= y + dy < map.height
+        )
+        self._indices = None
+
+    @property
+    def indices(self):
+        """
+        Arrays (ys, xs) of the visible squares, in the order of self.squares,
+        for indexing numpy arrays.  Only available for an ArrayMap.
+        """
+        if self._indices is None:
+            self._indices = self.map.square_indices(self.squares)
+        return self._indices
+
+
+class VisionCache:
+    """
+    Remembers each robot's Vision, so that it is only worked out again after
+    the robot moves or its vision radius changes (by TRAINing).  The offsets
+    of each vision radius are computed once for the whole process.
+    """
+    def __init__(self, map):
+        self.map = map
+        self.visions = {}
+
+    def get(self, robot):
+        """
+        Returns the Vision of a robot where it is now.
+        """
+        vision = self.visions.get(robot.id)
+        radius = robot.type.vision_radius
+        if vision is None or vision.x != robot.x or vision.y != robot.y or vision.radius != radius:
+            vision = Vision(self.map, robot.x, robot.y, radius)
+            self.visions[robot.id] = vision
+        return vision
+
+    def forget(self, robot):
+        """
+        Forget a robot that has died.
+        """
+        self.visions.pop(robot.id, None)
@@ -0,0 +1,123 @@
+from subprocess import Popen, DEVNULL
+import array
+import os
+import os.path
+import socket
+
+from ..common.errors import InvalidLanguageError
+
+_my_dir = os.path.dirname(os.path.realpath(__file__))
+_server_path = os.path.join(_my_dir, "zygote_server.py")
+
+class Zygote:
+    """
+    A Zygote is a process that has already started an interpreter and imported
+    a competitor's code, and forks a copy of itself for every new robot.  This
+    makes spawning a robot cost a fork instead of a full interpreter start up.
+    """
+    def __init__(self, path_to_code, language, sandbox=None):
+        """
+        Start the zygote server.
+
+        path_to_code:  directory containing the competitor's main.py
+        language:  language the competitor's code is written in
+        sandbox:  if given, a Sandbox whose rlimits the server, and so every
+                process forked from it, runs under
+        """
+        if language != "python":
+            raise InvalidLanguageError("Sorry, but " + language + " is not supported.")
+
+        self.socket, server_socket = socket.socketpair()
+        command = ["python", _server_path, os.path.join(path_to_code, "main.py"),
+                   str(server_socket.fileno())]
+        options = dict(pass_fds=[server_socket.fileno()], stdin=DEVNULL, stdout=DEVNULL)
+        if sandbox:
+            self.process = sandbox.popen(command, cgroup=False, **options)
+        else:
+            self.process = Popen(command, **options)
+        server_socket.close()
+        self.reply_buffer = b""
+
+    def spawn(self, args=()):
+        """
+        Fork a new copy of the competitor's code, run with the given command
+        line arguments.  Returns a ForkedProcess connected to it by pipes.
+        """
+        stdin_read, stdin_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        child_fds = [stdin_read, stdout_write, stderr_write]
+        try:
+            message = "\0".join(["spawn"] + list(args)).encode()
+            self.socket.sendmsg(
+                [message],
+                [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", child_fds))],
+            )
+        finally:
+            for fd in child_fds:
+                os.close(fd)
+
+        pid = int(self.read_reply())
+        return ForkedProcess(
+            self,
+            pid,
+            os.fdopen(stdin_write, "wb"),
+            os.fdopen(stdout_read, "rb", 0),
+            os.fdopen(stderr_read, "rb", 0),
+        )
+
+    def read_reply(self):
+        """
+        Read a line sent back by the zygote server.
+        """
+        while b"\n" not in self.reply_buffer:
+            data = self.socket.recv(4096)
+            if not data:
+                raise ConnectionError("The zygote server has stopped.")
+            self.reply_buffer += data
+        line, _, self.reply_buffer = self.reply_buffer.partition(b"\n")
+        return line.decode()
+
+    def kill_child(self, pid):
+        """
+        Have the server kill one of the processes it forked, if it is still
+        running.  The server knows which of its children are alive, so it
+        never kills a process that has reused the pid.
+        """
+        try:
+            self.socket.sendall("\0".join(["kill", str(pid)]).encode())
+            # Requests are answered one at a time so that they are never read
+            # from the socket together.
+            self.read_reply()
+        except (OSError, ConnectionError):
+            # The server has stopped, so it cannot tell whether pid is still
+            # the robot's.
+            pass
+
+    def kill(self):
+        """
+        Stop the zygote server.  Robots already spawned keep running.
+        """
+        self.socket.close()
+        self.process.kill()
+        self.process.wait()
+
+
+class ForkedProcess:
+    """
+    The part of the Popen interface that BotProcess uses, for a process forked
+    by a Zygote.  The process is a child of the zygote server, which reaps it,
+    so it can only be killed, through the server, not waited on.
+    """
+    def __init__(self, zygote, pid, stdin, stdout, stderr):
+        self.zygote = zygote
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+
+    def kill(self):
+        self.zygote.kill_child(self.pid)
+
+    def wait(self):
+        pass
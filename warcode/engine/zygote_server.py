@@ -0,0 +1,165 @@
+"""
+The server side of a Zygote.  This file is run on its own by the bot's
+interpreter, so it must not import anything from warcode.
+
+Usage:  python zygote_server.py <path to main.py> <socket file descriptor>
+
+The server imports the bot's main.py once (not as __main__), which pulls in
+every module it imports and runs main.py's module-level setup.  Then, for
+each "spawn" request on the socket, it receives the stdin, stdout, and stderr
+file descriptors of a new robot and forks.  The child, with those as its
+standard streams, runs only the body of main.py's
+`if __name__ == "__main__":` block, in the module the server imported.  A
+main.py without such a block is run again from the top instead.  The child's
+pid is sent back as a line of text.
+
+A "kill" request names a pid to kill, and is answered with "ok".  The server
+only kills children it has not reaped yet, so a pid that has been reused by
+another process is never signalled.
+"""
+import array
+import ast
+import importlib.util
+import os
+import os.path
+import runpy
+import signal
+import socket
+import sys
+import traceback
+
+_FD_SIZE = array.array("i").itemsize
+
+
+def receive(sock):
+    """
+    Receive a request.  Returns (command, arguments, file descriptors), or
+    (None, None, None) if the engine has closed the socket.
+    """
+    message, ancillary, _, _ = sock.recvmsg(4096, socket.CMSG_LEN(3 * _FD_SIZE))
+    if not message:
+        return None, None, None
+    fds = array.array("i")
+    for level, type, data in ancillary:
+        if level == socket.SOL_SOCKET and type == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - len(data) % _FD_SIZE])
+    command, *arguments = message.decode().split("\0")
+    return command, arguments, list(fds)
+
+
+def is_main_guard(node):
+    """
+    Returns whether a statement is `if __name__ == "__main__":`.
+    """
+    if not (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and len(node.test.ops) == 1 and isinstance(node.test.ops[0], ast.Eq)):
+        return False
+    sides = [node.test.left] + node.test.comparators
+    names = [side.id for side in sides if isinstance(side, ast.Name)]
+    strings = [getattr(side, "value", getattr(side, "s", None)) for side in sides]
+    return names == ["__name__"] and "__main__" in strings
+
+
+def compile_main_body(main_path):
+    """
+    Returns the bodies of main.py's top-level `if __name__ == "__main__":`
+    blocks compiled together, or None if it has none.
+    """
+    with open(main_path) as file:
+        tree = ast.parse(file.read(), main_path)
+    body = [statement for node in tree.body if is_main_guard(node) for statement in node.body]
+    if not body:
+        return None
+    module = ast.Module(body=body)
+    module.type_ignores = []
+    return compile(module, main_path, "exec")
+
+
+def run_child(main_path, module, main_body, arguments, fds):
+    """
+    Run the bot in a freshly forked child.  Never returns.
+    """
+    code = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.argv = [main_path] + arguments
+        if main_body is None:
+            runpy.run_path(main_path, run_name="__main__")
+        else:
+            module.__name__ = "__main__"
+            sys.modules["__main__"] = module
+            exec(main_body, module.__dict__)
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def main(main_path, socket_fd):
+    sock = socket.socket(fileno=socket_fd)
+
+    # Import the bot's code once so that every child starts with it loaded.
+    sys.path.insert(0, os.path.dirname(main_path))
+    spec = importlib.util.spec_from_file_location("__warcode_bot__", main_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    main_body = compile_main_body(main_path)
+
+    # Children that have not been reaped yet.  Until a child is reaped its pid
+    # cannot be reused, so these are the only pids that are safe to kill.
+    children = set()
+
+    while True:
+        command, arguments, fds = receive(sock)
+        if command is None:
+            return
+        reap(children)
+
+        if command == "kill":
+            pid = int(arguments[0])
+            if pid in children:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                children.discard(pid)
+            sock.sendall(b"ok\n")
+            continue
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            sock.close()
+            run_child(main_path, module, main_body, arguments, fds)
+
+        children.add(pid)
+        for fd in fds:
+            os.close(fd)
+        sock.sendall(str(pid).encode() + b"\n")
+
+
+def reap(children):
+    """
+    Reap the children that have exited.
+    """
+    while children:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            children.clear()
+            return
+        if pid == 0:
+            return
+        children.discard(pid)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], int(sys.argv[2]))
@@ -1 +1,6 @@
-from .main import main
+try:
+    from .main import main
+except ImportError:
+    # The map creator's window needs tkinter and Pillow.  The converter does
+    # not, so it can still be used without them.
+    pass
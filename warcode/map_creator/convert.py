@@ -0,0 +1,56 @@
+"""
+Converts maps between the json .wcm format and the binary .wcmb format.  The
+conversion is lossless both ways:  a .wcm file written by the map creator and
+converted to .wcmb and back is the same, byte for byte.
+
+Usage:  python -m warcode.map_creator.convert SOURCE [DESTINATION]
+
+The format to convert to is the one the source is not.  DESTINATION defaults
+to the source with its extension swapped.
+"""
+import argparse
+import json
+import os.path
+
+from ..common.binary_map import write_binary_map
+from ..common.map import read_map_data
+
+
+def destination_for(source):
+    """
+    Returns the path a map file is converted to by default.
+    """
+    root, extension = os.path.splitext(source)
+    return root + (".wcm" if extension == ".wcmb" else ".wcmb")
+
+
+def convert(source, destination=None):
+    """
+    Convert a map file to the other format.  Returns the destination path.
+    """
+    destination = destination or destination_for(source)
+    data = read_map_data(source)
+    if destination.endswith(".wcmb"):
+        write_binary_map(data, destination)
+    else:
+        if not isinstance(data, dict):
+            data = data.to_dict()
+        with open(destination, "w") as f:
+            json.dump(data, f)
+    return destination
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", help="map file to convert")
+    parser.add_argument("destination", nargs="?", default=None,
+                        help="file to write (default: the source with its extension swapped)")
+    args = parser.parse_args(argv)
+
+    destination = convert(args.source, args.destination)
+    print("{} ({} bytes) -> {} ({} bytes)".format(
+        args.source, os.path.getsize(args.source), destination, os.path.getsize(destination)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@ import json
 import os.path
 
 from ..common import Robot, GoldMine, Tree
+from ..common.id import IdAllocator
 
 class MapData:
     def __init__(self, width=30, height=30, name="Untitled", save_file=None):
+        # Hands out the ids of new entities.
+        self.ids = IdAllocator()
         if save_file is not None:
             self.load(self.save_file)
             return
@@ -31,6 +34,8 @@ class MapData:
         self.gold_mines = {gold_mine_info["id"]: GoldMine.from_dict(gold_mine_info) for gold_mine_info in data["gold_mines"]}
         self.trees = {tree_info["id"]: Tree.from_dict(tree_info) for tree_info in data["trees"]}
         self.robots = {robot_info["id"]: Robot.from_dict(robot_info) for robot_info in data["robots"]}
+        for id in self.gold_mines.keys() | self.trees.keys() | self.robots.keys():
+            self.ids.add_id(id)
 
     def save(self, file=None):
         self.save_file = file or self.save_file
@@ -65,18 +70,18 @@ class MapData:
 
     def add_gold_mine(self, x, y):
         self.delete_square(x, y)
-        gold_mine = GoldMine(x, y)
+        gold_mine = GoldMine(x, y, ids=self.ids)
         self.gold_mines[gold_mine.id] = gold_mine
         self.map[y][x] = gold_mine.id
 
     def add_tree(self, x, y):
         self.delete_square(x, y)
-        tree = Tree(x, y)
+        tree = Tree(x, y, ids=self.ids)
         self.trees[tree.id] = tree
         self.map[y][x] = tree.id
 
     def add_robot(self, x, y, robot_type, team):
         self.delete_square(x, y)
-        robot = Robot(x, y, robot_type, team)
+        robot = Robot(x, y, robot_type, team, ids=self.ids)
         self.robots[robot.id] = robot
         self.map[y][x] = robot.id
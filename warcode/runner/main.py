@@ -1,5 +1,47 @@
-def main():
-    pass
+import argparse
+import os.path
+
+from ..engine.game import find_map
+from .tournament import all_maps, run_tournament, standings
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m warcode.runner",
+        description="Run a round robin tournament between bots.",
+    )
+    parser.add_argument("bots", nargs="+", help="directories of the bots to play")
+    parser.add_argument("--maps", nargs="+", default=None,
+                        help="map names or paths (default: every map in resources/maps)")
+    parser.add_argument("--results", default="results.jsonl",
+                        help="file to append results to; existing results are skipped")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of games to run at once (default: number of cores)")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="number of times to play every match")
+    parser.add_argument("--cooperative", action="store_true",
+                        help="do not suspend bots between turns")
+    parser.add_argument("--multiplex", action="store_true",
+                        help="run one process per team")
+    parser.add_argument("--zygote", action="store_true",
+                        help="fork robots from a zygote per bot")
+    args = parser.parse_args(args)
+
+    if len(args.bots) < 2:
+        parser.error("at least two bots are needed")
+
+    bots = [os.path.abspath(bot) for bot in args.bots]
+    maps = [os.path.abspath(find_map(map)) for map in args.maps] if args.maps else all_maps()
+    game_options = {
+        "cooperative": args.cooperative,
+        "multiplex": args.multiplex,
+        "zygote": args.zygote,
+    }
+
+    results = run_tournament(bots, maps, args.results, args.processes, args.rounds, game_options)
+    errors = sum(result["error"] is not None for result in results)
+    print("Played {} games ({} errors).".format(len(results), errors))
+    for bot, wins, games in standings(args.results):
+        print("{:>5} / {:<5} {}".format(wins, games, bot))
 
 if __name__ == "__main__":
     main()
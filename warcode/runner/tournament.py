@@ -0,0 +1,168 @@
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import os.path
+import time
+import traceback
+
+from ..common import map_registry
+from ..engine.game import Game, find_map
+
+_my_dir = os.path.dirname(os.path.realpath(__file__))
+_map_dir = os.path.abspath(os.path.join(_my_dir, os.pardir, os.pardir, "resources", "maps"))
+
+
+def all_maps():
+    """
+    Returns the paths of every map in resources/maps.
+    """
+    return sorted(glob.glob(os.path.join(_map_dir, "*.wcm")))
+
+
+def round_robin(bot_dirs, maps, rounds=1):
+    """
+    Returns a list of matches, one for every pair of bots on every map with
+    both colour assignments, repeated rounds times.  A match is a dictionary
+    with the keys "map", "red", "blue", "red_index", "blue_index", and
+    "round", where the indices are the bots' positions in bot_dirs.  A bot may
+    be given twice to play itself.
+    """
+    return [
+        {"map": map, "red": bot_dirs[red], "blue": bot_dirs[blue],
+         "red_index": red, "blue_index": blue, "round": round}
+        for round in range(rounds)
+        for map in maps
+        for index1, index2 in itertools.combinations(range(len(bot_dirs)), 2)
+        for red, blue in ((index1, index2), (index2, index1))
+    ]
+
+
+def match_key(match):
+    # The indices tell apart the matches of a bot given twice.
+    return (match["map"], match["red"], match["blue"], match.get("red_index"),
+            match.get("blue_index"), match["round"])
+
+
+def load_finished(results_file):
+    """
+    Returns the keys of the matches that already finished successfully in
+    results_file.  A line cut short by a crash is ignored.
+    """
+    finished = set()
+    if not os.path.exists(results_file):
+        return finished
+    with open(results_file) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("error") is None:
+                finished.add(match_key(result))
+    return finished
+
+
+def drop_partial_line(results_file):
+    """
+    Cut off the last line of results_file if a crash left it unfinished, so
+    that the next result appended does not end up on the same line.
+    """
+    if not os.path.exists(results_file):
+        return
+    with open(results_file, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def run_match(match, game_options=None):
+    """
+    Play a match and return its result:  the match with "winner" (the winning
+    team, or None), "winner_dir", "turns", "seed", "seconds", and "error"
+    added.
+    """
+    result = dict(match)
+    result["winner"] = None
+    result["winner_dir"] = None
+    result["turns"] = 0
+    result["seed"] = None
+    result["error"] = None
+    start_time = time.monotonic()
+    try:
+        game = Game(match["map"], match["red"], match["blue"], **(game_options or {}))
+        result["seed"] = game.seed
+        winner = game.run()
+        result["turns"] = game.turn
+        if winner is not None:
+            result["winner"] = winner.to_string()
+            result["winner_dir"] = match["red"] if result["winner"] == "RED" else match["blue"]
+    except Exception:
+        result["error"] = traceback.format_exc()
+    result["seconds"] = time.monotonic() - start_time
+    return result
+
+
+def _run_match(args):
+    return run_match(*args)
+
+
+def run_tournament(bot_dirs, maps, results_file, processes=None, rounds=1, game_options=None):
+    """
+    Play every match of a round robin between bot_dirs on maps in a pool of
+    processes, appending each result to results_file as a line of json as soon
+    as it finishes.  Matches already in results_file are skipped, so an
+    interrupted tournament can be resumed by running it again.
+
+    Returns the list of results of the matches played by this call.
+    """
+    drop_partial_line(results_file)
+    finished = load_finished(results_file)
+    matches = [
+        match for match in round_robin(bot_dirs, maps, rounds)
+        if match_key(match) not in finished
+    ]
+
+    results = []
+    if not matches:
+        return results
+
+    # Parse the maps before the pool forks, so that the workers share them.
+    map_registry.preload(find_map(map) for map in maps)
+
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(processes, maxtasksperchild=50) as pool, \
+            open(results_file, "a") as f:
+        tasks = ((match, game_options) for match in matches)
+        for result in pool.imap_unordered(_run_match, tasks):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            results.append(result)
+    return results
+
+
+def standings(results_file):
+    """
+    Returns a list of (bot directory, wins, games) from the results in
+    results_file, best first.  A game of a bot against itself counts once.
+    """
+    wins = {}
+    games = {}
+    with open(results_file) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if result.get("error") is not None:
+                continue
+            for bot in {result["red"], result["blue"]}:
+                games[bot] = games.get(bot, 0) + 1
+                wins.setdefault(bot, 0)
+            if result["winner_dir"] is not None:
+                wins[result["winner_dir"]] += 1
+    return sorted(
+        ((bot, wins[bot], games[bot]) for bot in games),
+        key=lambda standing: (-standing[1], standing[0]),
+    )
@@ -1 +1 @@
-#from .sandbox import create_sandbox
+from .sandbox import Sandbox, create_sandbox
@@ -0,0 +1,33 @@
+"""
+Applies a Sandbox's limits to its own process and then replaces itself with
+the command to run in the sandbox.  This file is run on its own, so it must
+not import anything from warcode.
+
+Usage:  python -S launcher.py <cgroup directory> <memory limit> <process limit>
+                              <command> [<argument> ...]
+
+Each of the limits may be empty to leave it unset.  Sandbox.popen starts
+every sandboxed process through this script, instead of applying the limits
+between fork and exec in the engine's process, which is not safe while the
+engine has other threads running.
+"""
+import os
+import resource
+import sys
+
+
+def main(cgroup, memory_limit, process_limit, *command):
+    if cgroup:
+        with open(os.path.join(cgroup, "cgroup.procs"), "w") as file:
+            file.write(str(os.getpid()))
+    if memory_limit:
+        limit = int(memory_limit)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if process_limit:
+        limit = int(process_limit)
+        resource.setrlimit(resource.RLIMIT_NPROC, (limit, limit))
+    os.execvp(command[0], command)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
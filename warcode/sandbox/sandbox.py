@@ -0,0 +1,193 @@
+from subprocess import Popen
+import itertools
+import os
+import os.path
+import psutil
+import signal
+import sys
+import time
+
+_cgroup_names = itertools.count()
+
+_launcher_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "launcher.py")
+
+class Sandbox:
+    """
+    Limits on the processes competitors' code runs in, and a clock of the CPU
+    time they use.
+
+    Every process gets rlimits on its address space and on the number of
+    processes it may start.  If a cgroup directory is given, each process is
+    also put in a cgroup of its own there, which limits the memory and number
+    of processes of everything it starts and counts their CPU time too.
+
+    Time limits on sandboxed code are judged on the CPU time it uses, so code
+    that is descheduled because the host is busy is not penalised.  A wall
+    clock cap, wall_factor times the time limit, still stops code that sleeps
+    or blocks.
+    """
+    def __init__(self, memory_limit=None, process_limit=None, cgroup_parent=None,
+                 wall_factor=10):
+        """
+        memory_limit:  bytes of address space (RLIMIT_AS) each process may use
+        process_limit:  RLIMIT_NPROC for each process.  Linux counts every
+                process and thread of the user against it, so it must leave room
+                for everything else the user runs.  It does not apply to root.
+        cgroup_parent:  a directory in a cgroup v2 hierarchy that we may create
+                cgroups in, or None to not use cgroups.  If the cgroups cannot
+                be set up, the rlimits are used alone.
+        wall_factor:  how many times the time limit code may take by the wall
+                clock
+        """
+        self.memory_limit = memory_limit
+        self.process_limit = process_limit
+        self.cgroup_parent = cgroup_parent
+        self.wall_factor = wall_factor
+        # Cgroup directory of each process in one, by pid.
+        self.cgroups = {}
+        if cgroup_parent and not self.enable_controllers():
+            self.cgroup_parent = None
+
+    def enable_controllers(self):
+        """
+        Let the cgroups we create limit memory and processes.  Returns whether
+        cgroup_parent can be used.
+        """
+        try:
+            with open(os.path.join(self.cgroup_parent, "cgroup.subtree_control"), "w") as file:
+                file.write("+memory +pids")
+            return True
+        except OSError:
+            return False
+
+    def popen(self, command, cgroup=True, **kwargs):
+        """
+        Start command, a list of arguments, in the sandbox.  Takes the same
+        keyword arguments as Popen, except for preexec_fn.  The limits are
+        applied by launcher.py, which then execs the command.  The process
+        is started in a session of its own, so that kill can find everything
+        it starts even without a cgroup.
+
+        cgroup:  if False, only the rlimits are applied.  Processes forked by a
+                zygote inherit its rlimits, but should not share its cgroup.
+        """
+        path = None
+        if cgroup and self.cgroup_parent:
+            path = self.create_cgroup()
+
+        launcher = [
+            sys.executable, "-S", _launcher_path,
+            path or "",
+            str(self.memory_limit) if self.memory_limit is not None else "",
+            str(self.process_limit) if self.process_limit is not None else "",
+        ]
+        process = Popen(launcher + list(command), start_new_session=True, **kwargs)
+        if path:
+            self.cgroups[process.pid] = path
+        return process
+
+    def create_cgroup(self):
+        """
+        Create a cgroup for a process.  Returns its directory, or None if it
+        could not be created.
+        """
+        path = os.path.join(self.cgroup_parent,
+                            "warcode-{}-{}".format(os.getpid(), next(_cgroup_names)))
+        try:
+            os.mkdir(path)
+            if self.memory_limit is not None:
+                with open(os.path.join(path, "memory.max"), "w") as file:
+                    file.write(str(self.memory_limit))
+            if self.process_limit is not None:
+                with open(os.path.join(path, "pids.max"), "w") as file:
+                    file.write(str(self.process_limit))
+        except OSError:
+            self.remove_cgroup(path)
+            return None
+        return path
+
+    def cpu_time(self, pid):
+        """
+        Returns the seconds of CPU time used by a process, counting all of its
+        threads.  For a process in a cgroup, everything else in the cgroup,
+        such as processes it started, is counted too.
+        """
+        path = self.cgroups.get(pid)
+        if path:
+            try:
+                with open(os.path.join(path, "cpu.stat")) as file:
+                    for line in file:
+                        name, value = line.split()
+                        if name == "usage_usec":
+                            return int(value) / 1e6
+            except OSError:
+                pass
+        try:
+            times = psutil.Process(pid).cpu_times()
+        except psutil.Error:
+            return 0
+        return times.user + times.system + times.children_user + times.children_system
+
+    def kill(self, process):
+        """
+        Kill a process started by popen together with every process it
+        started, wait for it, and remove its cgroup.  Without a cgroup, its
+        process group is killed instead, which misses only processes that
+        left the group themselves.
+        """
+        path = self.cgroups.pop(process.pid, None)
+        if not (path and self.kill_cgroup(path)):
+            # The process has not been waited on yet, so its process group id
+            # cannot have been reused.
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        process.kill()
+        process.wait()
+        if path:
+            self.remove_cgroup(path)
+
+    def kill_cgroup(self, path, timeout=1):
+        """
+        Kill every process in a cgroup and wait until it is empty.  Returns
+        whether it was emptied.
+        """
+        try:
+            with open(os.path.join(path, "cgroup.kill"), "w") as file:
+                file.write("1")
+        except OSError:
+            # Kernels before 5.14 have no cgroup.kill.
+            pass
+        end_time = time.monotonic() + timeout
+        while True:
+            try:
+                with open(os.path.join(path, "cgroup.procs")) as file:
+                    pids = [int(line) for line in file if line.strip()]
+            except OSError:
+                return False
+            if not pids:
+                return True
+            if time.monotonic() > end_time:
+                return False
+            for pid in pids:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            time.sleep(0.001)
+
+    def remove_cgroup(self, path):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+def create_sandbox(memory_limit=512 * 1024 * 1024, process_limit=None, cgroup_parent=None,
+                   wall_factor=10):
+    """
+    Returns a Sandbox.  See Sandbox for the arguments.  By default each process
+    may use 512 MiB of address space, and cgroups are not used.
+    """
+    return Sandbox(memory_limit, process_limit, cgroup_parent, wall_factor)